@@ -8,3 +8,4 @@ admin.site.register(Usuario)
 admin.site.register(UsuarioRol)
 admin.site.register(Recurso)
 admin.site.register(RecursoRol)
+admin.site.register(RefreshTokenRevocado)
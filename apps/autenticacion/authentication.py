@@ -0,0 +1,103 @@
+"""
+Autenticación JWT sin consultas a la base de datos.
+
+``JWTAuthCookieMiddleware`` copia la cookie ``access_token`` a la cabecera
+Authorization y ``JWTCookieAuthentication`` la valida. En lugar de cargar el
+``Usuario`` en cada petición construye un ``UsuarioToken`` con los claims del
+token (ver ``tokens.py``); la única comprobación extra es la versión de
+permisos, que se lee de la cache.
+
+Las vistas que necesiten el modelo completo pueden usar ``request.user.usuario``,
+que sale de una cache TTL acotada de usuarios vistos recientemente.
+"""
+import time
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.autenticacion.cache import CacheLRU, version_permisos
+from apps.autenticacion.tokens import CLAIM_ADMIN, CLAIM_ROLES, CLAIM_VERSION
+
+# token crudo -> token ya validado (firma y claims comprobados)
+_tokens_verificados = CacheLRU(getattr(settings, 'JWT_TOKENS_VERIFICADOS_MAXIMO', 4096))
+
+# usuario_id -> Usuario (solo lectura: la instancia se comparte entre peticiones)
+_usuarios = CacheLRU(
+    getattr(settings, 'USUARIOS_CACHE_MAXIMO', 512),
+    ttl=getattr(settings, 'USUARIOS_CACHE_TTL', 60),
+)
+
+
+def obtener_usuario(usuario_id):
+    """Devuelve el ``Usuario`` desde la cache TTL, o None si no existe."""
+    from apps.autenticacion.models import Usuario  # evita import circular
+
+    usuario = _usuarios.get(usuario_id)
+    if usuario is None:
+        usuario = Usuario.objects.filter(pk=usuario_id).first()
+        if usuario is not None:
+            _usuarios.set(usuario_id, usuario)
+    return usuario
+
+
+def olvidar_usuario(usuario_id):
+    _usuarios.discard(usuario_id)
+
+
+class UsuarioToken(TokenUser):
+    """Usuario ligero construido a partir de los claims del JWT."""
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def roles(self):
+        return tuple((rol_id, nombre) for rol_id, nombre in self.token[CLAIM_ROLES])
+
+    @cached_property
+    def es_admin(self):
+        return bool(self.token[CLAIM_ADMIN])
+
+    @cached_property
+    def usuario(self):
+        """El ``Usuario`` completo, para las vistas que lo necesiten."""
+        return obtener_usuario(self.id)
+
+    def __str__(self):
+        return self.username or f"Usuario {self.id}"
+
+
+class JWTCookieAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        token = _tokens_verificados.get(raw_token)
+        if token is not None:
+            if token['exp'] > time.time():
+                return token
+            _tokens_verificados.discard(raw_token)
+
+        token = super().get_validated_token(raw_token)
+        _tokens_verificados.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        # Tokens emitidos sin nuestros claims: camino normal (con BD)
+        if CLAIM_VERSION not in validated_token:
+            return super().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = UsuarioToken(validated_token)
+        version = version_permisos(user.id)
+        if version is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if version != validated_token[CLAIM_VERSION]:
+            raise InvalidToken('Los permisos del usuario cambiaron, vuelve a iniciar sesión.')
+        return user
@@ -0,0 +1,367 @@
+"""
+Snapshot de permisos por usuario.
+
+Cada snapshot guarda los roles del usuario, si es administrador y los recursos
+que tiene permitidos. Vive en un diccionario local del proceso (L1) respaldado
+por el framework de cache de Django (L2). La validez se controla con dos
+versiones guardadas en la cache de Django:
+
+- una versión global, que cambia cuando se modifican Rol, Recurso o RecursoRol;
+- una versión por usuario, que cambia cuando se modifican sus UsuarioRol.
+
+Las señales de ``signals.py`` se encargan de renovar esas versiones, así que una
+petición "caliente" solo consulta la cache y no hace ninguna query.
+
+El índice de patrones de ``Recurso.url`` (``rutas.py``) tiene su propia versión
+y solo se reconstruye cuando cambia un Recurso.
+
+Además se cachean ``Usuario.permisos_version`` (lo que va en el claim ``pv`` de
+los JWT) y el mapa rol -> urls permitidas, que es lo único que hace falta para
+decidir desde los claims del token.
+
+Las invalidaciones solo llegan a los demás procesos si la cache de Django es
+compartida (Redis, Memcached). Con ``LocMemCache`` cada proceso tiene sus propias
+versiones: por eso todo (versiones, snapshots y la L1) vence a los
+``PERMISOS_CACHE_TIMEOUT`` segundos, que es lo más que un proceso puede seguir
+usando permisos revocados en otro. ``check --deploy`` avisa de esa configuración.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+ADMIN_NAMES = ['administrador', 'Administrador', 'Admin', 'admin']
+
+_CLAVE_GLOBAL = 'autenticacion:permisos:global'
+_CLAVE_RECURSOS = 'autenticacion:permisos:recursos'
+_CLAVE_USUARIO = 'autenticacion:permisos:usuario:{}'
+_CLAVE_SNAPSHOT = 'autenticacion:permisos:snapshot:{}:{}:{}'
+_CLAVE_ROLES = 'autenticacion:permisos:roles:{}'
+_CLAVE_VERSION_TOKEN = 'autenticacion:permisos:pv:{}'
+
+# Máximo de parámetros por "IN (...)" en operaciones masivas
+TROZO = 500
+
+
+@dataclass(frozen=True)
+class PermisosUsuario:
+    usuario_id: int
+    roles: tuple          # ((rol_id, nombre), ...)
+    es_admin: bool
+    recursos: frozenset   # ids de Recurso permitidos
+    urls: frozenset       # urls de los recursos permitidos
+    detalle: tuple        # ((recurso_id, nombre, url), ...) ordenado por url
+    etag: str             # huella del contenido, para respuestas condicionales
+
+    @property
+    def rol_ids(self):
+        return frozenset(rol_id for rol_id, _ in self.roles)
+
+
+# ---- Versiones ----
+
+def _nueva_version():
+    # Un valor aleatorio (y no un contador) evita que una clave expulsada de la
+    # cache vuelva a tomar un valor que un proceso aún tenga en su L1.
+    return uuid.uuid4().hex[:12]
+
+
+def _timeout():
+    return getattr(settings, 'PERMISOS_CACHE_TIMEOUT', 300)
+
+
+def _leer_version(clave):
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _nueva_version(), _timeout())
+        version = cache.get(clave)
+    return version
+
+
+def _leer_versiones(usuario_id):
+    clave_usuario = _CLAVE_USUARIO.format(usuario_id)
+    valores = cache.get_many([_CLAVE_GLOBAL, clave_usuario])
+
+    global_ = valores.get(_CLAVE_GLOBAL)
+    if global_ is None:
+        global_ = _leer_version(_CLAVE_GLOBAL)
+
+    usuario = valores.get(clave_usuario)
+    if usuario is None:
+        usuario = _leer_version(clave_usuario)
+
+    return global_, usuario
+
+
+def _renovar(claves):
+    """
+    Cambia las versiones ahora y otra vez al confirmar: entre tanto un lector
+    pudo reconstruir el snapshot con las filas de antes del commit y guardarlo
+    bajo la versión nueva.
+    """
+    def renovar():
+        version = _nueva_version()
+        cache.set_many({clave: version for clave in claves}, _timeout())
+
+    renovar()
+    transaction.on_commit(renovar)
+
+
+def invalidar_usuario(usuario_id):
+    """Invalida el snapshot de un usuario (cambió alguno de sus UsuarioRol)."""
+    _renovar([_CLAVE_USUARIO.format(usuario_id)])
+
+
+def invalidar_usuarios(usuario_ids):
+    """Igual que ``invalidar_usuario`` pero en una sola operación de cache."""
+    _renovar([_CLAVE_USUARIO.format(uid) for uid in set(usuario_ids)])
+
+
+# ---- Invalidación agrupada (operaciones masivas) ----
+
+_lote = threading.local()
+
+
+@contextmanager
+def invalidacion_en_lote():
+    """
+    Dentro del bloque, las invalidaciones por usuario que disparan las señales
+    se acumulan y se aplican una sola vez al salir (si no hubo excepción). Si el
+    bloque está dentro de una transacción, las versiones se renuevan de nuevo al
+    confirmarla (ver ``_renovar``).
+    """
+    if getattr(_lote, 'usuarios', None) is not None:
+        yield  # ya hay un lote abierto más arriba
+        return
+
+    _lote.usuarios = set()
+    try:
+        yield
+        usuarios = _lote.usuarios
+    finally:
+        _lote.usuarios = None
+
+    if usuarios:
+        invalidar_usuarios(usuarios)
+        incrementar_version_permisos(usuarios)
+
+
+def diferir_usuarios(usuario_ids):
+    """Si hay un lote abierto, registra los usuarios y devuelve True."""
+    usuarios = getattr(_lote, 'usuarios', None)
+    if usuarios is None:
+        return False
+    usuarios.update(usuario_ids)
+    return True
+
+
+def invalidar_todo():
+    """Invalida todos los snapshots (cambió un Rol, Recurso o RecursoRol)."""
+    _renovar([_CLAVE_GLOBAL])
+
+
+def invalidar_recursos():
+    """Obliga a reconstruir el índice de rutas (cambió un Recurso)."""
+    _renovar([_CLAVE_RECURSOS])
+
+
+# ---- Cache local del proceso ----
+
+class CacheLRU:
+    """
+    LRU acotado y thread-safe, con TTL opcional (en segundos).
+    Se usa como L1 de los snapshots y desde ``authentication.py``.
+    """
+
+    def __init__(self, maximo, ttl=None):
+        self.maximo = maximo
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        expira = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def discard(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+# usuario_id -> (versiones, snapshot)
+_local = CacheLRU(
+    getattr(settings, 'PERMISOS_CACHE_LOCAL_MAXIMO', 1024),
+    ttl=getattr(settings, 'PERMISOS_CACHE_TIMEOUT', 300),
+)
+
+
+# ---- Construcción del snapshot ----
+
+def _construir_snapshot(usuario_id):
+    from apps.autenticacion.models import UsuarioRol  # evita import circular
+
+    # Una sola query: UsuarioRol -> Rol -> RecursoRol -> Recurso (LEFT JOIN)
+    filas = UsuarioRol.objects.filter(usuario_id=usuario_id).values_list(
+        'rol_id', 'rol__nombre',
+        'rol__recursos__recurso_id', 'rol__recursos__recurso__nombre', 'rol__recursos__recurso__url',
+    )
+
+    roles = {}
+    recursos = {}
+    for rol_id, nombre, recurso_id, recurso_nombre, url in filas:
+        roles[rol_id] = nombre
+        if recurso_id is not None:
+            recursos[recurso_id] = (recurso_id, recurso_nombre, url)
+
+    roles = tuple(sorted(roles.items()))
+    detalle = tuple(sorted(recursos.values(), key=lambda r: r[2]))
+    admin = {n.lower() for n in ADMIN_NAMES}
+    return PermisosUsuario(
+        usuario_id=usuario_id,
+        roles=roles,
+        es_admin=any(nombre.lower() in admin for _, nombre in roles),
+        recursos=frozenset(recursos),
+        urls=frozenset(url for _, _, url in detalle),
+        detalle=detalle,
+        etag=hashlib.sha1(repr((usuario_id, roles, detalle)).encode()).hexdigest(),
+    )
+
+
+def obtener_permisos(usuario_id):
+    """Devuelve el ``PermisosUsuario`` vigente, calculándolo solo si hace falta."""
+    versiones = _leer_versiones(usuario_id)
+
+    entrada = _local.get(usuario_id)
+    if entrada is not None and entrada[0] == versiones:
+        return entrada[1]
+
+    clave = _CLAVE_SNAPSHOT.format(versiones[0], versiones[1], usuario_id)
+    snapshot = cache.get(clave)
+    if snapshot is None:
+        snapshot = _construir_snapshot(usuario_id)
+        cache.set(clave, snapshot, _timeout())
+
+    _local.set(usuario_id, (versiones, snapshot))
+    return snapshot
+
+
+# ---- Mapa rol -> urls (para decidir desde los claims del JWT) ----
+
+_roles_local = (None, {})  # (versión global, mapa)
+
+
+def urls_por_rol():
+    """Devuelve ``{rol_id: frozenset(urls)}`` para todos los roles."""
+    global _roles_local
+
+    version = _leer_version(_CLAVE_GLOBAL)
+    version_local, mapa = _roles_local
+    if version_local == version:
+        return mapa
+
+    clave = _CLAVE_ROLES.format(version)
+    mapa = cache.get(clave)
+    if mapa is None:
+        from apps.autenticacion.models import RecursoRol
+
+        acumulado = {}
+        for rol_id, url in RecursoRol.objects.values_list('rol_id', 'recurso__url'):
+            acumulado.setdefault(rol_id, set()).add(url)
+        mapa = {rol_id: frozenset(urls) for rol_id, urls in acumulado.items()}
+        cache.set(clave, mapa, _timeout())
+
+    _roles_local = (version, mapa)
+    return mapa
+
+
+# ---- Índice de patrones de Recurso.url ----
+
+_indice_local = (None, None)  # (versión de recursos, IndiceRutas)
+
+
+def indice_rutas():
+    """Devuelve el ``IndiceRutas`` vigente con todas las urls de Recurso."""
+    global _indice_local
+    from apps.autenticacion.models import Recurso
+    from apps.autenticacion.rutas import IndiceRutas, PatronInvalido
+
+    version = _leer_version(_CLAVE_RECURSOS)
+    version_local, indice = _indice_local
+    if version_local == version:
+        return indice
+
+    indice = IndiceRutas()
+    for url in Recurso.objects.values_list('url', flat=True):
+        try:
+            indice.agregar(url)
+        except PatronInvalido:
+            continue  # filas anteriores a la validación del serializer
+
+    _indice_local = (version, indice)
+    return indice
+
+
+# ---- Versión de permisos del usuario (claim "pv") ----
+
+def version_permisos(usuario_id):
+    """``Usuario.permisos_version`` actual, leída de la cache si es posible."""
+    clave = _CLAVE_VERSION_TOKEN.format(usuario_id)
+    version = cache.get(clave)
+    if version is None:
+        from apps.autenticacion.models import Usuario
+
+        version = (
+            Usuario.objects.filter(pk=usuario_id)
+            .values_list('permisos_version', flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+        cache.set(clave, version, _timeout())
+    return version
+
+
+def incrementar_version_permisos(usuario_ids):
+    """Sube ``permisos_version`` para que se rechacen los JWT ya emitidos."""
+    from apps.autenticacion.models import Usuario
+
+    usuario_ids = list(set(usuario_ids))
+    if not usuario_ids:
+        return
+    for i in range(0, len(usuario_ids), TROZO):
+        Usuario.objects.filter(pk__in=usuario_ids[i:i + TROZO]).update(
+            permisos_version=F('permisos_version') + 1
+        )
+
+    claves = [_CLAVE_VERSION_TOKEN.format(uid) for uid in usuario_ids]
+    cache.delete_many(claves)
+    # Un lector concurrente pudo volver a cachear el valor viejo antes del commit
+    transaction.on_commit(lambda: cache.delete_many(claves))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartida(app_configs, **kwargs):
+    """Con una cache por proceso, los permisos, catálogos y productos cambiados tardan en verse en los demás."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if not backend.endswith('LocMemCache') and not backend.endswith('DummyCache'):
+        return []
+    return [Warning(
+        "La cache 'default' no es compartida entre procesos.",
+        hint=(
+            "Los cambios de roles y recursos hechos en un proceso se ven en los demás recién "
+            f"a los PERMISOS_CACHE_TIMEOUT ({getattr(settings, 'PERMISOS_CACHE_TIMEOUT', 300)} s), "
+            "los de marcas, tipos de categoría y préstamos a los CATALOGOS_CACHE_TIMEOUT "
+            f"({getattr(settings, 'CATALOGOS_CACHE_TIMEOUT', 300)} s) y los productos en el "
+            "autocompletar a los AUTOCOMPLETAR_CACHE_TIMEOUT "
+            f"({getattr(settings, 'AUTOCOMPLETAR_CACHE_TIMEOUT', 300)} s). "
+            "Usa Redis o Memcached con varios workers."
+        ),
+        id='autenticacion.W001',
+    )]
@@ -0,0 +1,17 @@
+import django_filters
+
+from apps.autenticacion.models import Usuario
+
+
+class UsuarioFilter(django_filters.FilterSet):
+    # Solo búsquedas que pueden usar índice: exacta y por prefijo
+    username = django_filters.CharFilter(field_name='username', lookup_expr='exact')
+    username_empieza = django_filters.CharFilter(field_name='username', lookup_expr='startswith')
+    promedio_min = django_filters.NumberFilter(field_name='promedio', lookup_expr='gte')
+    promedio_max = django_filters.NumberFilter(field_name='promedio', lookup_expr='lte')
+    # (usuario, rol) es único, así que el join no duplica usuarios
+    rol = django_filters.NumberFilter(field_name='roles_asignados__rol')
+
+    class Meta:
+        model = Usuario
+        fields = ['username', 'disponibilidad', 'promedio', 'rol']
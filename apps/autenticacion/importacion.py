@@ -0,0 +1,215 @@
+"""
+Importación masiva de usuarios desde CSV.
+
+La usan el comando ``importar_usuarios`` y la vista ``UsuarioImportarView``.
+El archivo se lee en streaming por lotes; por cada lote:
+
+1. se validan las filas (un error en una fila no aborta el resto);
+2. se calculan los hashes de contraseña en un pool de procesos (PBKDF2 es CPU);
+3. se insertan usuarios y asignaciones de rol con ``bulk_create``.
+
+Cada lote se confirma por separado: si el archivo resulta ilegible a mitad de
+camino (``UnicodeDecodeError``, ``csv.Error``), los lotes anteriores quedan
+creados y ``resumen()`` dice cuántos.
+
+El pool de procesos se crea la primera vez que hace falta y se reutiliza entre
+importaciones, como el executor de ``login.py``.
+
+Columnas: username, password (obligatorias), email, first_name, last_name,
+promedio, disponibilidad y rol (nombre; si falta se usa el rol por defecto).
+"""
+import csv
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from apps.autenticacion.cache import TROZO
+from apps.autenticacion.models import Rol, Usuario, UsuarioRol
+
+COLUMNAS = ('username', 'email', 'first_name', 'last_name', 'promedio')
+VERDADEROS = {'1', 't', 'true', 'si', 'sí', 's', 'yes', 'y'}
+FALSOS = {'0', 'f', 'false', 'no', 'n'}
+
+# Con pocas filas no compensa levantar procesos
+MINIMO_PARA_POOL = 50
+
+
+def _iniciar_worker():
+    # Con "spawn" el proceso hijo no hereda Django configurado
+    django.setup()
+
+
+# procesos -> ProcessPoolExecutor, compartidos por todas las importaciones
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(procesos):
+    with _pools_lock:
+        pool = _pools.get(procesos)
+        if pool is None:
+            pool = _pools[procesos] = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker)
+        return pool
+
+
+def _hashear(passwords, procesos):
+    if len(passwords) < MINIMO_PARA_POOL:
+        return [make_password(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (procesos * 4))
+    pool = _pool(procesos)
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # Murió un proceso hijo: la próxima importación arma otro pool
+        with _pools_lock:
+            if _pools.get(procesos) is pool:
+                del _pools[procesos]
+        return [make_password(p) for p in passwords]
+
+
+def _limpiar_fila(fila):
+    """Devuelve (datos, password, rol) o lanza ValidationError con los errores de la fila."""
+    errores = {}
+    datos = {}
+    for nombre in COLUMNAS:
+        valor = (fila.get(nombre) or '').strip()
+        field = Usuario._meta.get_field(nombre)
+        if valor == '':
+            if nombre == 'username':
+                errores[nombre] = ['Es obligatorio.']
+            else:
+                datos[nombre] = None if field.null else ''
+            continue
+        try:
+            datos[nombre] = field.clean(valor, None)
+        except ValidationError as e:
+            errores[nombre] = e.messages
+
+    disponibilidad = (fila.get('disponibilidad') or '').strip().lower()
+    if disponibilidad == '':
+        datos['disponibilidad'] = True
+    elif disponibilidad in VERDADEROS:
+        datos['disponibilidad'] = True
+    elif disponibilidad in FALSOS:
+        datos['disponibilidad'] = False
+    else:
+        errores['disponibilidad'] = ['Debe ser sí/no, true/false o 1/0.']
+
+    password = fila.get('password') or ''
+    if not password:
+        errores['password'] = ['Es obligatorio.']
+
+    if errores:
+        raise ValidationError(errores)
+    return datos, password, (fila.get('rol') or '').strip()
+
+
+class ImportadorUsuarios:
+    def __init__(self, rol_por_defecto='Usuario', lote=500, procesos=None):
+        self.rol_por_defecto = rol_por_defecto
+        self.lote = lote
+        self.procesos = procesos or getattr(settings, 'IMPORTACION_PROCESOS', None) or os.cpu_count() or 1
+        self.creados = 0
+        self.errores = []   # [{"fila": n, "errores": {...}}]
+        self._roles = {}    # nombre -> Rol
+
+    def importar(self, archivo_texto):
+        """Importa desde un archivo de texto abierto y devuelve el resumen."""
+        lector = csv.DictReader(archivo_texto)
+        filas = enumerate(lector, start=2)  # la fila 1 es la cabecera
+
+        while True:
+            lote = list(islice(filas, self.lote))
+            if not lote:
+                break
+            self._procesar_lote(lote)
+
+        return self.resumen()
+
+    def resumen(self):
+        errores = sorted(self.errores, key=lambda e: e["fila"])
+        return {"creados": self.creados, "con_errores": len(errores), "errores": errores}
+
+    def _error(self, numero, errores):
+        self.errores.append({"fila": numero, "errores": errores})
+
+    def _rol(self, nombre):
+        if nombre not in self._roles:
+            if nombre == self.rol_por_defecto:
+                self._roles[nombre], _ = Rol.objects.get_or_create(nombre=nombre)
+            else:
+                self._roles[nombre] = Rol.objects.filter(nombre=nombre).first()
+        return self._roles[nombre]
+
+    def _procesar_lote(self, lote):
+        validas = []  # (numero, datos, password, rol)
+        for numero, fila in lote:
+            try:
+                datos, password, nombre_rol = _limpiar_fila(fila)
+            except ValidationError as e:
+                self._error(numero, e.message_dict)
+                continue
+            rol = self._rol(nombre_rol or self.rol_por_defecto)
+            if rol is None:
+                self._error(numero, {"rol": [f"No existe el rol '{nombre_rol}'."]})
+                continue
+            validas.append((numero, datos, password, rol))
+
+        # Usernames repetidos: en la base de datos o dentro del mismo archivo
+        usernames = [datos['username'] for _, datos, _, _ in validas]
+        existentes = set()
+        for i in range(0, len(usernames), TROZO):
+            existentes.update(
+                Usuario.objects.filter(username__in=usernames[i:i + TROZO]).values_list('username', flat=True)
+            )
+        unicas = []
+        for fila in validas:
+            username = fila[1]['username']
+            if username in existentes:
+                self._error(fila[0], {"username": ["Ya existe un usuario con ese username."]})
+            else:
+                existentes.add(username)
+                unicas.append(fila)
+        if not unicas:
+            return
+
+        hashes = _hashear([password for _, _, password, _ in unicas], self.procesos)
+        usuarios = [Usuario(password=h, **datos) for (_, datos, _, _), h in zip(unicas, hashes)]
+
+        try:
+            with transaction.atomic():
+                self._insertar(usuarios, [rol for *_, rol in unicas])
+            self.creados += len(usuarios)
+        except IntegrityError:
+            # Alguien creó uno de estos usernames mientras tanto: fila por fila
+            for (numero, *_, rol), usuario in zip(unicas, usuarios):
+                usuario.pk = None
+                try:
+                    with transaction.atomic():
+                        self._insertar([usuario], [rol])
+                    self.creados += 1
+                except IntegrityError:
+                    self._error(numero, {"username": ["Ya existe un usuario con ese username."]})
+
+    def _insertar(self, usuarios, roles):
+        Usuario.objects.bulk_create(usuarios)
+        if any(u.pk is None for u in usuarios):
+            # Motores sin RETURNING en inserciones masivas
+            ids = dict(
+                Usuario.objects.filter(username__in=[u.username for u in usuarios]).values_list('username', 'id')
+            )
+            for u in usuarios:
+                u.pk = ids[u.username]
+        # Usuarios nuevos: no tienen snapshots ni tokens que invalidar
+        UsuarioRol.objects.bulk_create(
+            [UsuarioRol(usuario=u, rol=rol) for u, rol in zip(usuarios, roles)],
+            ignore_conflicts=True,
+        )
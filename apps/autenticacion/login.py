@@ -0,0 +1,84 @@
+"""
+Login asíncrono con el hash de la contraseña fuera del event loop.
+
+``authenticate()`` calcula PBKDF2, que es CPU puro (hashlib libera el GIL
+mientras lo calcula). Bajo ASGI se ejecuta en un ThreadPoolExecutor propio y
+acotado (``LOGIN_CONCURRENCIA`` hilos), así una ráfaga de logins no ocupa los
+workers que atienden las lecturas. Si ya hay ``LOGIN_CONCURRENCIA +
+LOGIN_COLA_MAXIMA`` logins en curso, el siguiente falla de inmediato
+(``ColaLlena``) en lugar de esperar.
+
+Con ``LOGIN_CONCURRENCIA = 0`` no se usa el executor: el login corre en el
+hilo de Django vía ``sync_to_async`` (útil en tests, donde la transacción del
+TestCase no es visible desde otros hilos).
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import close_old_connections
+
+from apps.autenticacion.tokens import RefreshTokenConRoles
+
+
+class ColaLlena(Exception):
+    pass
+
+
+class LimitadorLogin:
+    def __init__(self, concurrencia, cola_maxima):
+        self.limite = concurrencia + cola_maxima
+        self._executor = None
+        if concurrencia > 0:
+            self._executor = ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix='login')
+        self._en_curso = 0
+        self._lock = threading.Lock()
+
+    def _reservar(self):
+        with self._lock:
+            if self._en_curso >= self.limite:
+                return False
+            self._en_curso += 1
+            return True
+
+    def _liberar(self):
+        with self._lock:
+            self._en_curso -= 1
+
+    async def ejecutar(self, funcion, *args):
+        if not self._reservar():
+            raise ColaLlena()
+        try:
+            if self._executor is None:
+                return await sync_to_async(funcion)(*args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, funcion, *args)
+        finally:
+            self._liberar()
+
+
+def _login(username, password):
+    """Corre en un hilo del executor: autentica y arma los tokens."""
+    # Los hilos del executor no pasan por request_started/finished
+    close_old_connections()
+    try:
+        user = authenticate(username=username, password=password)
+        if user is None:
+            return None, None
+        return user, RefreshTokenConRoles.for_user(user)
+    finally:
+        close_old_connections()
+
+
+limitador = LimitadorLogin(
+    getattr(settings, 'LOGIN_CONCURRENCIA', 4),
+    getattr(settings, 'LOGIN_COLA_MAXIMA', 32),
+)
+
+
+async def autenticar(username, password):
+    """Devuelve (user, refresh) o (None, None); lanza ColaLlena si no hay cupo."""
+    return await limitador.ejecutar(_login, username, password)
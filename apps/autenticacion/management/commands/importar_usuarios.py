@@ -0,0 +1,39 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.autenticacion.importacion import ImportadorUsuarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuarios desde un CSV (username, password, email, first_name, last_name, "
+        "promedio, disponibilidad, rol). Las filas con errores se reportan sin abortar la carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV")
+        parser.add_argument('--rol', default='Usuario', help="Rol para las filas sin columna rol")
+        parser.add_argument('--lote', type=int, default=500, help="Filas por lote de inserción")
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos para calcular los hashes")
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        importador = ImportadorUsuarios(
+            rol_por_defecto=options['rol'], lote=options['lote'], procesos=options['procesos'],
+        )
+        try:
+            with open(options['archivo'], newline='', encoding=options['encoding']) as f:
+                resumen = importador.importar(f)
+        except OSError as e:
+            raise CommandError(str(e))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(
+                f"No se pudo leer el CSV: {e} ({importador.creados} usuarios ya creados en lotes anteriores)."
+            )
+
+        for error in resumen['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['errores']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['creados']} usuarios creados, {resumen['con_errores']} filas con errores."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.autenticacion.models import RefreshTokenRevocado
+
+
+class Command(BaseCommand):
+    help = "Elimina los refresh tokens revocados que ya expiraron (usa el índice de expira_en)."
+
+    def handle(self, *args, **options):
+        borrados, _ = RefreshTokenRevocado.objects.filter(expira_en__lt=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"{borrados} tokens revocados eliminados."))
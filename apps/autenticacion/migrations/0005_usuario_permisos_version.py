@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0004_recurso_recursorol'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='permisos_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Aumenta cada vez que cambian los roles del usuario; invalida los JWT emitidos antes'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0005_usuario_permisos_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recurso',
+            name='url',
+            field=models.CharField(help_text='Ruta o patrón del backend sin dominio, ej: /api/entrenamientos/, /api/entrenamientos/<int:pk>/, /api/entrenamientos/**', max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0006_alter_recurso_url'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['disponibilidad', 'username'], name='usuario_disp_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['promedio'], name='usuario_promedio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuariorol',
+            index=models.Index(fields=['rol', 'usuario'], name='usuariorol_rol_usuario_idx'),
+        ),
+    ]
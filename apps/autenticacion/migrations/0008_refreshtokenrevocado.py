@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0007_usuario_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefreshTokenRevocado',
+            fields=[
+                ('jti', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('expira_en', models.DateTimeField(db_index=True, help_text='Después de esta fecha el token ya no es válido y la fila se puede purgar')),
+            ],
+            options={
+                'verbose_name': 'Refresh token revocado',
+                'verbose_name_plural': 'Refresh tokens revocados',
+            },
+        ),
+    ]
@@ -28,13 +28,31 @@ class Rol(models.Model):
 class Usuario(TimeStampedModel, AbstractUser):
     promedio = models.FloatField(null=True, blank=True, verbose_name="Promedio académico", help_text="Promedio del usuario (si aplica)")
     disponibilidad = models.BooleanField(default=True, verbose_name="¿Está disponible?", help_text="Indica si el usuario está disponible")
+    permisos_version = models.PositiveIntegerField(default=0, editable=False, help_text="Aumenta cada vez que cambian los roles del usuario; invalida los JWT emitidos antes")
 
     class Meta:
         verbose_name = "Perfil de usuario"
         verbose_name_plural = "Perfiles de usuarios"
+        indexes = [
+            # filtros del listado de usuarios + orden por username (keyset)
+            models.Index(fields=['disponibilidad', 'username'], name='usuario_disp_username_idx'),
+            models.Index(fields=['promedio'], name='usuario_promedio_idx'),
+        ]
 
     def __str__(self):
         return f"{self.username} - {self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        # permisos_version solo se cambia con UPDATE ... F() (ver
+        # cache.incrementar_version_permisos). Un save() completo con una
+        # instancia cargada antes del cambio la haría retroceder y revalidaría
+        # tokens ya revocados.
+        if not self._state.adding and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'permisos_version'
+            ]
+        super().save(*args, **kwargs)
  
 #usuario_rol
 class UsuarioRol(models.Model):
@@ -46,13 +64,17 @@ class UsuarioRol(models.Model):
         verbose_name = "Asignación de Rol"
         verbose_name_plural = "Asignaciones de Roles"
         unique_together = ['usuario', 'rol']
+        indexes = [
+            # filtro ?rol= del listado de usuarios
+            models.Index(fields=['rol', 'usuario'], name='usuariorol_rol_usuario_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario} → {self.rol}"
     
 class Recurso(models.Model):
     nombre = models.CharField(max_length=100, unique=True, help_text="Nombre legible del recurso")
-    url = models.CharField(max_length=255, unique=True, help_text="Ruta del backend sin dominio, ej: /api/entrenamientos/")
+    url = models.CharField(max_length=255, unique=True, help_text="Ruta o patrón del backend sin dominio, ej: /api/entrenamientos/, /api/entrenamientos/<int:pk>/, /api/entrenamientos/**")
 
     def __str__(self):
         return f"{self.nombre} ({self.url})"
@@ -66,4 +88,17 @@ class RecursoRol(models.Model):
         unique_together = ('rol', 'recurso')
 
     def __str__(self):
-        return f"{self.rol.nombre} → {self.recurso.url}"
\ No newline at end of file
+        return f"{self.rol.nombre} → {self.recurso.url}"
+
+
+class RefreshTokenRevocado(models.Model):
+    """Refresh tokens ya rotados o cerrados; se buscan por jti (llave primaria)."""
+    jti = models.CharField(max_length=64, primary_key=True)
+    expira_en = models.DateTimeField(db_index=True, help_text="Después de esta fecha el token ya no es válido y la fila se puede purgar")
+
+    class Meta:
+        verbose_name = "Refresh token revocado"
+        verbose_name_plural = "Refresh tokens revocados"
+
+    def __str__(self):
+        return self.jti
@@ -1,30 +1,46 @@
 from rest_framework.permissions import BasePermission
-from django.urls import resolve
-from apps.autenticacion.models import Recurso, RecursoRol, UsuarioRol
+from apps.autenticacion.authentication import UsuarioToken
+from apps.autenticacion.cache import ADMIN_NAMES, indice_rutas, obtener_permisos, urls_por_rol
+
+
+def usuario_token(request):
+    """
+    Devuelve el ``UsuarioToken`` de la petición, o None si el usuario no viene
+    de ``JWTCookieAuthentication`` (tokens antiguos, sesión del admin). La
+    versión de permisos ya la comprobó la autenticación.
+    """
+    user = request.user
+    return user if isinstance(user, UsuarioToken) else None
+
 
 class IsAdminRole(BasePermission):
-    ADMIN_NAMES = ['administrador', 'Administrador', 'Admin', 'admin']
+    ADMIN_NAMES = ADMIN_NAMES
 
     def has_permission(self, request, view):
         user = request.user
         if not user.is_authenticated:
             return False
 
-        roles = UsuarioRol.objects.filter(usuario=user).select_related('rol')
-        nombres_roles = [r.rol.nombre.lower() for r in roles]
-        return any(nombre in self.ADMIN_NAMES for nombre in nombres_roles)
-    
+        token_user = usuario_token(request)
+        if token_user is not None:
+            return token_user.es_admin
+        return obtener_permisos(user.pk).es_admin
+
 class TieneAccesoRecurso(BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        
-        path = request.path
 
-        try:
-            recurso = Recurso.objects.get(url=path)
-        except Recurso.DoesNotExist:
+        # Patrón (Recurso.url) más específico que cubre la ruta pedida
+        patron = indice_rutas().buscar(request.path)
+        if patron is None:
             return False
 
-        roles_usuario = UsuarioRol.objects.filter(usuario=request.user).values_list('rol', flat=True)
-        return RecursoRol.objects.filter(recurso=recurso, rol__in=roles_usuario).exists()
\ No newline at end of file
+        token_user = usuario_token(request)
+        if token_user is not None:
+            mapa = urls_por_rol()
+            return any(patron in mapa.get(rol_id, ()) for rol_id, _ in token_user.roles)
+
+        # Los recursos permitidos vienen en el snapshot: no hace falta
+        # buscar el Recurso ni los roles en la base de datos.
+        return patron in obtener_permisos(request.user.pk).urls
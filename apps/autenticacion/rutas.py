@@ -0,0 +1,130 @@
+"""
+Índice de patrones de ``Recurso.url``.
+
+Un recurso puede registrarse con una ruta exacta (``/api/renta/rentas/``) o con
+un patrón por segmentos:
+
+- ``<int:pk>``, ``<slug:x>``, ``<str:x>``, ``<uuid:x>``: convertidores de Django;
+- ``*``: cualquier segmento;
+- ``**`` o ``<path:x>`` al final: cualquier resto de la ruta (prefijo).
+
+Los patrones se compilan en un trie por segmentos. Al buscar se prefiere el
+patrón más específico: literal > convertidor > ``*`` > prefijo. El índice se
+guarda en memoria del proceso y solo se reconstruye cuando cambia un Recurso.
+"""
+import re
+
+from django.urls.converters import get_converters
+
+_CONVERTIDOR = re.compile(r'^<(?:(?P<tipo>[^>:]+):)?(?P<nombre>[^>]+)>$')
+
+
+class PatronInvalido(ValueError):
+    pass
+
+
+def _segmentos(ruta):
+    return [s for s in ruta.strip('/').split('/') if s]
+
+
+class _Nodo:
+    __slots__ = ('literales', 'convertidores', 'comodin', 'resto', 'url')
+
+    def __init__(self):
+        self.literales = {}
+        self.convertidores = []   # [(regex compilada, _Nodo)]
+        self.comodin = None       # '*'
+        self.resto = None         # url del patrón con '**' / <path:>
+        self.url = None           # url del patrón que termina aquí
+
+
+def _compilar_segmento(segmento):
+    """Devuelve ('literal', s), ('convertidor', regex), ('comodin',) o ('resto',)."""
+    if segmento == '**':
+        return ('resto',)
+    if segmento == '*':
+        return ('comodin',)
+
+    m = _CONVERTIDOR.match(segmento)
+    if m is None:
+        if '<' in segmento or '>' in segmento:
+            raise PatronInvalido(f"Segmento mal formado: {segmento!r}")
+        return ('literal', segmento)
+
+    tipo = m.group('tipo') or 'str'
+    convertidores = get_converters()
+    if tipo not in convertidores:
+        raise PatronInvalido(f"Convertidor desconocido: {tipo!r}")
+    if tipo == 'path':
+        return ('resto',)
+    return ('convertidor', re.compile(convertidores[tipo].regex))
+
+
+def validar_patron(url):
+    """Lanza ``PatronInvalido`` si ``url`` no es un patrón válido."""
+    segmentos = _segmentos(url)
+    for i, segmento in enumerate(segmentos):
+        if _compilar_segmento(segmento)[0] == 'resto' and i != len(segmentos) - 1:
+            raise PatronInvalido("'**' y <path:...> solo pueden ir al final del patrón")
+
+
+class IndiceRutas:
+    def __init__(self, urls=()):
+        self._raiz = _Nodo()
+        for url in urls:
+            self.agregar(url)
+
+    def agregar(self, url):
+        validar_patron(url)
+        nodo = self._raiz
+        for segmento in _segmentos(url):
+            compilado = _compilar_segmento(segmento)
+            tipo = compilado[0]
+            if tipo == 'resto':
+                nodo.resto = url
+                return
+            if tipo == 'literal':
+                nodo = nodo.literales.setdefault(compilado[1], _Nodo())
+            elif tipo == 'comodin':
+                if nodo.comodin is None:
+                    nodo.comodin = _Nodo()
+                nodo = nodo.comodin
+            else:
+                regex = compilado[1]
+                for existente, hijo in nodo.convertidores:
+                    if existente.pattern == regex.pattern:
+                        nodo = hijo
+                        break
+                else:
+                    hijo = _Nodo()
+                    nodo.convertidores.append((regex, hijo))
+                    nodo = hijo
+        nodo.url = url
+
+    def buscar(self, ruta):
+        """Devuelve la url del patrón más específico que cubre ``ruta``, o None."""
+        return self._buscar(self._raiz, _segmentos(ruta), 0)
+
+    def _buscar(self, nodo, segmentos, i):
+        if i == len(segmentos):
+            return nodo.url or nodo.resto
+
+        segmento = segmentos[i]
+        hijo = nodo.literales.get(segmento)
+        if hijo is not None:
+            encontrado = self._buscar(hijo, segmentos, i + 1)
+            if encontrado is not None:
+                return encontrado
+
+        for regex, hijo in nodo.convertidores:
+            if regex.fullmatch(segmento):
+                encontrado = self._buscar(hijo, segmentos, i + 1)
+                if encontrado is not None:
+                    return encontrado
+
+        if nodo.comodin is not None:
+            encontrado = self._buscar(nodo.comodin, segmentos, i + 1)
+            if encontrado is not None:
+                return encontrado
+
+        return nodo.resto
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.autenticacion.authentication import olvidar_usuario
+from apps.autenticacion.cache import (
+    diferir_usuarios, incrementar_version_permisos, invalidar_recursos, invalidar_todo, invalidar_usuario,
+)
+from apps.autenticacion.models import Recurso, RecursoRol, Rol, Usuario, UsuarioRol
+
+
+# Cambios en las asignaciones de un usuario: su snapshot y sus JWT
+@receiver([post_save, post_delete], sender=UsuarioRol)
+def invalidar_permisos_usuario(sender, instance, **kwargs):
+    if diferir_usuarios([instance.usuario_id]):
+        return  # se invalida una sola vez al cerrar el lote
+    invalidar_usuario(instance.usuario_id)
+    incrementar_version_permisos([instance.usuario_id])
+
+
+# Cambios en roles o recursos: afectan a cualquier usuario
+@receiver([post_save, post_delete], sender=Rol)
+@receiver([post_save, post_delete], sender=Recurso)
+@receiver([post_save, post_delete], sender=RecursoRol)
+def invalidar_permisos_globales(sender, instance, **kwargs):
+    invalidar_todo()
+
+
+@receiver([post_save, post_delete], sender=Recurso)
+def invalidar_indice_rutas(sender, instance, **kwargs):
+    invalidar_recursos()
+
+
+# Un rol renombrado cambia los claims (nombre, admin) de quienes lo tienen.
+# Al borrarlo no hace falta: el CASCADE dispara la señal de cada UsuarioRol.
+@receiver(post_save, sender=Rol)
+def invalidar_tokens_rol(sender, instance, created, **kwargs):
+    if created:
+        return
+    usuario_ids = UsuarioRol.objects.filter(rol=instance).values_list('usuario_id', flat=True)
+    incrementar_version_permisos(usuario_ids)
+
+
+# La autenticación no carga el Usuario: desactivarlo o borrarlo debe invalidar
+# sus JWT. Al borrarlo no hay fila que actualizar, pero se descarta la versión
+# cacheada y version_permisos() devuelve None
+@receiver([post_save, post_delete], sender=Usuario)
+def invalidar_usuario_cacheado(sender, instance, **kwargs):
+    olvidar_usuario(instance.pk)
+    if kwargs.get('signal') is post_delete or not instance.is_active:
+        incrementar_version_permisos([instance.pk])
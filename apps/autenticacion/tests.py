@@ -1,3 +1,264 @@
-from django.test import TestCase
+import io
+import time
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.autenticacion import cache as cache_permisos, importacion
+from apps.autenticacion.cache import CacheLRU, invalidar_usuario, obtener_permisos, version_permisos
+from apps.autenticacion.checks import cache_compartida
+from apps.autenticacion.login import LimitadorLogin
+from apps.autenticacion.models import Recurso, RecursoRol, Rol, Usuario, UsuarioRol
+
+
+def iniciar_sesion(client, username, password):
+    """Login por la API con el hash en el hilo del test (ve la transacción del TestCase)."""
+    with mock.patch('apps.autenticacion.login.limitador', LimitadorLogin(0, 4)):
+        respuesta = client.post(
+            '/api/autenticacion/login/', {'username': username, 'password': password}, format='json',
+        )
+    client.cookies['access_token'] = respuesta.cookies['access_token'].value
+    return respuesta
+
+
+class CacheEntreProcesosTests(TestCase):
+    """Cada ``proceso`` tiene su LocMemCache y su L1, como dos workers sin Redis."""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='ana', password='x')
+        self.asignacion = UsuarioRol.objects.create(
+            usuario=self.usuario, rol=Rol.objects.create(nombre='admin'),
+        )
+        self.locales = {}
+
+    @contextmanager
+    def proceso(self, nombre):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'{self.id()}-{nombre}',
+        }}
+        local = self.locales.setdefault(nombre, CacheLRU(100, ttl=1))
+        with override_settings(CACHES=caches, PERMISOS_CACHE_TIMEOUT=1), \
+                mock.patch.object(cache_permisos, '_local', local):
+            yield
+
+    def test_revocacion_llega_al_otro_proceso_al_vencer(self):
+        for nombre in ('a', 'b'):
+            with self.proceso(nombre):
+                self.assertTrue(obtener_permisos(self.usuario.pk).es_admin)
+                version_inicial = version_permisos(self.usuario.pk)
+
+        with self.proceso('a'):
+            self.asignacion.delete()
+            self.assertFalse(obtener_permisos(self.usuario.pk).es_admin)
+            self.assertEqual(version_permisos(self.usuario.pk), version_inicial + 1)
+
+        # "b" no se entera hasta que vencen sus entradas
+        with self.proceso('b'):
+            self.assertTrue(obtener_permisos(self.usuario.pk).es_admin)
+            self.assertEqual(version_permisos(self.usuario.pk), version_inicial)
+
+        time.sleep(1.1)
+        with self.proceso('b'):
+            self.assertFalse(obtener_permisos(self.usuario.pk).es_admin)
+            self.assertEqual(version_permisos(self.usuario.pk), version_inicial + 1)
+
+    def test_check_avisa_sin_cache_compartida(self):
+        self.assertEqual([w.id for w in cache_compartida(None)], ['autenticacion.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(cache_compartida(None), [])
+
+
+class AsignacionMasivaTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(username='admin', password='pw')
+        UsuarioRol.objects.create(usuario=self.admin, rol=Rol.objects.create(nombre='admin'))
+        self.rol = Rol.objects.create(nombre='lector')
+        self.ids = [Usuario.objects.create(username=f'u{i}').pk for i in range(5)]
+        self.client = APIClient()
+        iniciar_sesion(self.client, 'admin', 'pw')
+
+    def asignar(self, ids):
+        return self.client.post(
+            '/api/autenticacion/roles/asignar-masivo/', {'rol': self.rol.pk, 'usuarios': ids}, format='json',
+        )
+
+    def test_cuenta_solo_filas_insertadas(self):
+        UsuarioRol.objects.create(usuario_id=self.ids[0], rol=self.rol)
+        bulk_create = UsuarioRol.objects.bulk_create
+
+        def con_carrera(objs, *args, **kwargs):
+            # Otra petición asigna ids[1] entre la consulta y el insert
+            if not UsuarioRol.objects.filter(usuario_id=self.ids[1], rol=self.rol).exists():
+                bulk_create([UsuarioRol(usuario_id=self.ids[1], rol=self.rol)])
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(UsuarioRol.objects, 'bulk_create', side_effect=con_carrera):
+            respuesta = self.asignar(self.ids)
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertEqual(respuesta.data['procesados'], 3)
+        self.assertEqual(respuesta.data['omitidos'], 2)
+        self.assertEqual(UsuarioRol.objects.filter(rol=self.rol).count(), 5)
+
+    def test_invalida_y_revoca_tokens(self):
+        obtener_permisos(self.ids[0])
+        version = Usuario.objects.get(pk=self.ids[0]).permisos_version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.asignar(self.ids)
+        self.assertIn(self.rol.pk, obtener_permisos(self.ids[0]).rol_ids)
+        self.assertEqual(Usuario.objects.get(pk=self.ids[0]).permisos_version, version + 1)
+
+    def test_renueva_la_version_al_confirmar(self):
+        clave = cache_permisos._CLAVE_USUARIO.format(self.ids[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidar_usuario(self.ids[0])
+            # Un lector concurrente guarda un snapshot con las filas de antes del commit
+            antes = cache.get(clave)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(cache.get(clave), antes)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacionUsuariosTests(TestCase):
+    def setUp(self):
+        admin = Usuario.objects.create_user(username='admin', password='pw')
+        UsuarioRol.objects.create(usuario=admin, rol=Rol.objects.create(nombre='admin'))
+        self.client = APIClient()
+        iniciar_sesion(self.client, 'admin', 'pw')
+
+    def csv(self, desde, cantidad):
+        filas = ''.join(f'u{i},clave{i}\n' for i in range(desde, desde + cantidad))
+        return io.StringIO('username,password\n' + filas)
+
+    def test_reutiliza_el_pool_entre_importaciones(self):
+        with mock.patch.dict(importacion._pools, clear=True), \
+                mock.patch.object(importacion, 'ProcessPoolExecutor') as executor:
+            executor.return_value.map.side_effect = lambda f, datos, chunksize: map(f, datos)
+            for desde in (0, 100):
+                resumen = importacion.ImportadorUsuarios(procesos=2).importar(self.csv(desde, 60))
+                self.assertEqual(resumen['creados'], 60)
+        executor.assert_called_once()
+        self.assertTrue(Usuario.objects.get(username='u130').check_password('clave130'))
+
+    def test_archivo_ilegible_es_400(self):
+        archivo = SimpleUploadedFile('usuarios.csv', b'username,password\nana,x\n\xff\xfe\n')
+        respuesta = self.client.post('/usuarios/importar/', {'archivo': archivo})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('archivo', respuesta.data)
+        self.assertEqual(respuesta.data['creados'], 0)
+
+
+class LoginColaLlenaTests(TestCase):
+    def setUp(self):
+        Usuario.objects.create_user(username='ana', password='pw')
+        self.limitador = LimitadorLogin(0, 1)
+
+    def login(self):
+        with mock.patch('apps.autenticacion.login.limitador', self.limitador):
+            return self.client.post(
+                '/api/autenticacion/login/', {'username': 'ana', 'password': 'pw'},
+                content_type='application/json',
+            )
+
+    def test_responde_503_sin_esperar_si_no_hay_cupo(self):
+        self.assertTrue(self.limitador._reservar())  # un login en curso ocupa el único lugar
+        with mock.patch('apps.autenticacion.login._login') as login:
+            respuesta = self.login()
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta['Retry-After'], '2')
+        login.assert_not_called()
+
+        self.limitador._liberar()
+        self.assertEqual(self.login().status_code, 200)
+
+
+class ListadosTests(TestCase):
+    def setUp(self):
+        admin = Usuario.objects.create_user(username='admin', password='pw')
+        self.rol = Rol.objects.create(nombre='admin')
+        UsuarioRol.objects.create(usuario=admin, rol=self.rol)
+        recurso = Recurso.objects.create(nombre='productos', url='/api/inventario/api/productos/')
+        RecursoRol.objects.create(rol=self.rol, recurso=recurso)
+        self.client = APIClient()
+        iniciar_sesion(self.client, 'admin', 'pw')
+
+    def test_usuarios_paginados(self):
+        datos = self.client.get('/usuarios/').data
+        self.assertEqual([u['username'] for u in datos['results']], ['admin'])
+        self.assertIsNone(datos['next'])
+
+    def test_roles_y_recursos_sin_paginar(self):
+        self.assertEqual([r['nombre'] for r in self.client.get('/api/autenticacion/roles/').data], ['admin'])
+        self.assertEqual(len(self.client.get('/api/autenticacion/recursos/').data), 1)
+        self.assertEqual(len(self.client.get(f'/api/autenticacion/recursos-rol/{self.rol.pk}/').data), 1)
+
+
+class RenovacionSesionTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='ana', password='pw')
+        self.client = APIClient()
+        iniciar_sesion(self.client, 'ana', 'pw')
+
+    def renovar(self, refresh=None):
+        if refresh is not None:
+            self.client.cookies['refresh_token'] = refresh
+        return self.client.post('/api/autenticacion/refresh/')
+
+    def test_rota_ambas_cookies(self):
+        anterior = self.client.cookies['refresh_token'].value
+        acceso = self.client.cookies['access_token'].value
+        respuesta = self.renovar()
+        self.assertEqual(respuesta.status_code, 200, respuesta.data)
+        self.assertNotEqual(respuesta.cookies['refresh_token'].value, anterior)
+        self.assertNotEqual(respuesta.cookies['access_token'].value, acceso)
+        self.assertEqual(self.client.get('/api/autenticacion/mis-permisos/').status_code, 200)
+
+    def test_refresh_usado_no_se_reutiliza(self):
+        anterior = self.client.cookies['refresh_token'].value
+        self.assertEqual(self.renovar().status_code, 200)
+        respuesta = self.renovar(anterior)
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertEqual(respuesta.data['detail'], 'El refresh token ya fue usado')
+
+    def test_logout_revoca_el_refresh(self):
+        anterior = self.client.cookies['refresh_token'].value
+        self.client.post('/api/autenticacion/logout/')
+        self.assertEqual(self.renovar(anterior).status_code, 401)
+
+    def test_sin_cookie_o_invalida(self):
+        del self.client.cookies['refresh_token']
+        self.assertEqual(self.renovar().status_code, 401)
+        self.assertEqual(self.renovar('no-es-un-jwt').status_code, 401)
+
+
+class RevocacionTokensTests(TestCase):
+    def setUp(self):
+        # La cache no se limpia entre tests y SQLite reutiliza los pk: una
+        # versión cacheada de otro test coincidiría por casualidad
+        cache.clear()
+        self.usuario = Usuario.objects.create_user(username='ana', password='pw')
+        self.client = APIClient()
+        iniciar_sesion(self.client, 'ana', 'pw')
+
+    def test_cambio_de_roles_invalida_el_access_token(self):
+        self.assertEqual(self.client.get('/api/autenticacion/mis-permisos/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            UsuarioRol.objects.create(usuario=self.usuario, rol=Rol.objects.create(nombre='lector'))
+        self.assertEqual(self.client.get('/api/autenticacion/mis-permisos/').status_code, 401)
+
+        # El refresh emite un token con la versión y los roles vigentes
+        self.assertEqual(self.client.post('/api/autenticacion/refresh/').status_code, 200)
+        respuesta = self.client.get('/api/autenticacion/mis-permisos/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r['nombre'] for r in respuesta.data['roles']], ['lector'])
+
+    def test_usuario_borrado_no_autentica(self):
+        self.usuario.delete()
+        self.assertEqual(self.client.get('/api/autenticacion/mis-permisos/').status_code, 401)
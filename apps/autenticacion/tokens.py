@@ -0,0 +1,28 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.autenticacion.cache import obtener_permisos, version_permisos
+
+# Claims propios que viajan en el refresh y se copian al access token
+CLAIM_ROLES = 'roles'          # [[rol_id, nombre], ...]
+CLAIM_ADMIN = 'adm'            # bool
+CLAIM_VERSION = 'pv'           # Usuario.permisos_version al emitir el token
+
+
+class RefreshTokenConRoles(RefreshToken):
+    """
+    RefreshToken que incluye los roles del usuario y su versión de permisos,
+    para que los permisos se puedan decidir sin ir a la base de datos.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+
+        permisos = obtener_permisos(user.pk)
+        token['username'] = user.username
+        token[CLAIM_ROLES] = [[rol_id, nombre] for rol_id, nombre in permisos.roles]
+        token[CLAIM_ADMIN] = permisos.es_admin
+        # Se lee de la cache/BD y no de ``user``: la instancia puede estar
+        # desactualizada (p.ej. recién registrada, antes de asignarle el rol).
+        token[CLAIM_VERSION] = version_permisos(user.pk)
+        return token
@@ -5,12 +5,15 @@ urlpatterns = [
     path('hello/', HelloFromCookieView.as_view(), name='hello'),
     
     path('login/', CookieLoginView.as_view(), name='login_cookie'),
+    path('refresh/', CookieRefreshView.as_view(), name='refresh_cookie'),
     path('register/', RegisterView.as_view(), name='register'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('mis-permisos/', MisPermisosView.as_view(), name='mis_permisos'),
     
     path('roles/', RolListCreateView.as_view(), name='rol_list_create'),
     path('roles/<int:pk>/', RolRetrieveUpdateDestroyView.as_view(), name='rol_detail'),
     path('roles/asignar-rol/', UsuarioRolCreateView.as_view(), name='usuario_rol_create'),
+    path('roles/asignar-masivo/', AsignacionMasivaRolView.as_view(), name='usuario_rol_masivo'),
 
     path('recursos/', RecursoListCreateView.as_view(), name='lista-crea-recursos'),
     path('recursos/<int:pk>/', RecursoRetrieveUpdateDestroyView.as_view(), name='ver-editar-eliminar-recurso'),
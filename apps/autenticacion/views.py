@@ -5,22 +5,45 @@ from serializer.serializers import *
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.parsers import MultiPartParser
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import csv
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from apps.autenticacion.authentication import JWTCookieAuthentication, obtener_usuario
+from apps.autenticacion.models import RefreshTokenRevocado
+from apps.autenticacion.cache import TROZO, diferir_usuarios, invalidacion_en_lote, obtener_permisos
+from apps.autenticacion.filters import UsuarioFilter
+from apps.autenticacion.importacion import ImportadorUsuarios
+from apps.autenticacion.login import ColaLlena, autenticar
 from apps.autenticacion.permissions import TieneAccesoRecurso, IsAdminRole
+from apps.autenticacion.tokens import RefreshTokenConRoles
+from mi_proyecto.conditional import con_validadores, respuesta_no_modificada
+from serializer.mixins import CamposDinamicosViewMixin
 
 # REGISTRO DE USUARIOS
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     queryset = Usuario.objects.all()
+    authentication_classes = []  # una cookie vieja o revocada no debe impedir registrarse
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()  # 'user' es la instancia de Usuario
 
-        refresh = RefreshToken.for_user(user)
+        refresh = RefreshTokenConRoles.for_user(user)
 
         return Response({
             'refresh': str(refresh),
@@ -35,31 +58,107 @@ class RegisterView(generics.CreateAPIView):
         })
 
 # VISTAS DE USUARIOS
-class UsuarioListView(generics.ListAPIView):
-    queryset = Usuario.objects.all()
+# Los roles se traen en una sola query extra (prefetch), sin importar cuántos
+# usuarios tenga la página.
+def usuarios_con_roles():
+    return Usuario.objects.prefetch_related(
+        Prefetch('roles_asignados', queryset=UsuarioRol.objects.select_related('rol'))
+    )
+
+class UsuarioListView(CamposDinamicosViewMixin, generics.ListAPIView):
+    queryset = usuarios_con_roles().order_by('username')
     serializer_class = UsuarioSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = UsuarioFilter
 
-class UsuarioRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Usuario.objects.all()
+# Carga masiva desde CSV (multipart, campo "archivo"); ver importacion.py
+class UsuarioImportarView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminRole]
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"archivo": ["Es obligatorio."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        importador = ImportadorUsuarios(rol_por_defecto=request.data.get('rol') or 'Usuario')
+        try:
+            resumen = importador.importar(io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline=''))
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Los lotes anteriores ya se confirmaron: el resumen dice cuántos se crearon
+            return Response(
+                {"archivo": [f"No se pudo leer el CSV: {e}"], **importador.resumen()},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(resumen, status=status.HTTP_200_OK)
+
+class UsuarioRetrieveUpdateDestroyView(CamposDinamicosViewMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = usuarios_con_roles()
     serializer_class = UsuarioSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
 
+# COOKIES DE SESION (login y refresh)
+def poner_cookies_jwt(response, refresh):
+    response.set_cookie(
+        key='access_token',
+        value=str(refresh.access_token),
+        httponly=True,
+        secure=True,          # en prod; en local usa HTTPS o, si no puedes, pon False temporalmente
+        samesite='None',      # <— clave para cross-origin
+        max_age=60*60,
+    )
+
+    response.set_cookie(
+        key='refresh_token',
+        value=str(refresh),
+        httponly=True,
+        secure=True,          # idem
+        samesite='None',
+        max_age=60*60*24,
+    )
+    return response
+
+def revocar_refresh(token):
+    """
+    Registra el jti del refresh token como revocado. Devuelve False si ya lo
+    estaba: el INSERT sobre la llave primaria es a la vez la comprobación, así
+    que dos renovaciones concurrentes con el mismo token no pueden ganar ambas.
+    """
+    try:
+        with transaction.atomic():
+            RefreshTokenRevocado.objects.create(
+                jti=token[api_settings.JTI_CLAIM],
+                expira_en=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+            )
+    except IntegrityError:
+        return False
+    return True
+
 # INICIAR SESION
-class CookieLoginView(APIView):
-    def post(self, request):
-        username = request.data.get("username")
-        password = request.data.get("password")
+# Vista async de Django (DRF no soporta vistas async): el hash de la contraseña
+# corre en el executor acotado de login.py y, si está saturado, responde 503.
+@method_decorator(csrf_exempt, name='dispatch')
+class CookieLoginView(View):
+    http_method_names = ['post', 'options']
 
-        user = authenticate(username=username, password=password)
-        if user is None:
-            return Response({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
+    async def post(self, request):
+        username, password = _leer_credenciales(request)
+
+        try:
+            user, refresh = await autenticar(username, password)
+        except ColaLlena:
+            response = JsonResponse(
+                {"detail": "Demasiados inicios de sesión en curso, intenta de nuevo en unos segundos."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = '2'
+            return response
 
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
-        refresh_token = str(refresh)
+        if user is None:
+            return JsonResponse({"detail": "Credenciales inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        response = Response({
+        response = JsonResponse({
             "message": "Autenticación con cookies exitosa",
             "user": {
                 "id": user.id,
@@ -68,26 +167,48 @@ class CookieLoginView(APIView):
             }
         })
 
-        response.set_cookie(
-            key='access_token',
-            value=access_token,
-            httponly=True,
-            secure=True,          # en prod; en local usa HTTPS o, si no puedes, pon False temporalmente
-            samesite='None',      # <— clave para cross-origin
-            max_age=60*60,
-        )
-
-        response.set_cookie(
-            key='refresh_token',
-            value=refresh_token,
-            httponly=True,
-            secure=True,          # idem
-            samesite='None',
-            max_age=60*60*24,
-        )
-            
+        return poner_cookies_jwt(response, refresh)
 
-        return response
+def _leer_credenciales(request):
+    """username y password desde JSON o formulario."""
+    if request.content_type == 'application/json':
+        try:
+            datos = json.loads(request.body or b'{}')
+        except ValueError:
+            datos = {}
+        if not isinstance(datos, dict):
+            datos = {}
+    else:
+        datos = request.POST
+    return datos.get("username"), datos.get("password")
+
+# RENOVAR SESION
+# Usa la cookie refresh_token: no vuelve a calcular el hash de la contraseña.
+# Rota ambas cookies y, si JWT_REFRESH_REVOCAR está activo, revoca el refresh usado.
+class CookieRefreshView(APIView):
+    authentication_classes = []
+
+    def post(self, request):
+        raw_token = request.COOKIES.get('refresh_token')
+        if not raw_token:
+            return Response({"detail": "No se encontró el refresh token en cookies"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            anterior = RefreshToken(raw_token)
+        except TokenError as e:
+            return Response({"detail": f"Refresh token inválido: {str(e)}"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        usuario = obtener_usuario(int(anterior[api_settings.USER_ID_CLAIM]))
+        if usuario is None or not usuario.is_active:
+            return Response({"detail": "Usuario no encontrado o inactivo"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if settings.JWT_REFRESH_REVOCAR and not revocar_refresh(anterior):
+            return Response({"detail": "El refresh token ya fue usado"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Claims nuevos: si cambiaron los roles, el cliente recibe los vigentes
+        refresh = RefreshTokenConRoles.for_user(usuario)
+        response = Response({"message": "Sesión renovada"})
+        return poner_cookies_jwt(response, refresh)
 
 # VERIFICACION DE AUTENTICACION
 class HelloFromCookieView(APIView):
@@ -97,7 +218,7 @@ class HelloFromCookieView(APIView):
         if not access_token:
             return Response({"detail": "No se encontró el token en cookies"}, status=401)
         
-        jwt_authenticator = JWTAuthentication()
+        jwt_authenticator = JWTCookieAuthentication()
         try:
             validated_user, token = jwt_authenticator.authenticate(request._request)
         except Exception as e:
@@ -107,9 +228,41 @@ class HelloFromCookieView(APIView):
             "message": f"Hola, {validated_user.username}, estas autenticado <3"
         })
 
+# PERMISOS EFECTIVOS DEL USUARIO AUTENTICADO
+# Una sola llamada para que el frontend sepa qué puede hacer, en vez de
+# descubrirlo a base de 403. Sale del snapshot cacheado y lleva ETag.
+class MisPermisosView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        permisos = obtener_permisos(request.user.pk)
+
+        no_modificado = respuesta_no_modificada(request, permisos.etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        return con_validadores(Response({
+            "usuario_id": permisos.usuario_id,
+            "es_admin": permisos.es_admin,
+            "roles": [{"id": rol_id, "nombre": nombre} for rol_id, nombre in permisos.roles],
+            "recursos": [
+                {"id": recurso_id, "nombre": nombre, "url": url}
+                for recurso_id, nombre, url in permisos.detalle
+            ],
+        }), permisos.etag)
+
 # CERRAR SESION
 class LogoutView(APIView):
+    authentication_classes = []
+
     def post(self, request):
+        raw_token = request.COOKIES.get('refresh_token')
+        if raw_token and settings.JWT_REFRESH_REVOCAR:
+            try:
+                revocar_refresh(RefreshToken(raw_token))
+            except TokenError:
+                pass  # ya expirado o inválido: no hay nada que revocar
+
         response = Response({"message": "Sesión cerrada correctamente."})
         
         response.delete_cookie("access_token")
@@ -118,12 +271,13 @@ class LogoutView(APIView):
         return response
     
 # ROLES
-class RolListCreateView(generics.ListCreateAPIView):
+class RolListCreateView(CamposDinamicosViewMixin, generics.ListCreateAPIView):
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
+    pagination_class = None  # listas cortas, se devuelven enteras
     permission_classes = [IsAuthenticated, IsAdminRole]
 
-class RolRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class RolRetrieveUpdateDestroyView(CamposDinamicosViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
@@ -133,14 +287,88 @@ class UsuarioRolCreateView(generics.CreateAPIView):
     serializer_class = UsuarioRolSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
 
+# Asignar o revocar un rol a muchos usuarios en una sola transacción.
+# Las caches de permisos se invalidan una vez por lote, no por fila.
+class AsignacionMasivaRolView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminRole]
+
+    def post(self, request):
+        serializer = AsignacionMasivaRolSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        rol = datos['rol']
+
+        with transaction.atomic(), invalidacion_en_lote():
+            no_encontrados = []
+            if 'usuarios_qs' in datos:
+                usuario_ids = list(datos['usuarios_qs'].values_list('id', flat=True))
+            else:
+                pedidos = list(dict.fromkeys(datos['usuarios']))
+                usuario_ids = []
+                for i in range(0, len(pedidos), TROZO):
+                    trozo = pedidos[i:i + TROZO]
+                    existentes = set(Usuario.objects.filter(pk__in=trozo).values_list('id', flat=True))
+                    usuario_ids.extend(uid for uid in trozo if uid in existentes)
+                    no_encontrados.extend(uid for uid in trozo if uid not in existentes)
+
+            if datos['accion'] == 'asignar':
+                procesados = self._asignar(rol, usuario_ids)
+            else:
+                procesados = self._revocar(rol, usuario_ids)
+
+        return Response({
+            "rol": rol.id,
+            "accion": datos['accion'],
+            "usuarios": len(usuario_ids),
+            "procesados": procesados,
+            "omitidos": len(usuario_ids) - procesados,
+            "no_encontrados": no_encontrados,
+        }, status=status.HTTP_200_OK)
+
+    def _asignar(self, rol, usuario_ids):
+        insertados = 0
+        for i in range(0, len(usuario_ids), TROZO):
+            trozo = usuario_ids[i:i + TROZO]
+            ya_asignados = set(
+                UsuarioRol.objects.filter(rol=rol, usuario_id__in=trozo).values_list('usuario_id', flat=True)
+            )
+            nuevos = [UsuarioRol(usuario_id=uid, rol=rol) for uid in trozo if uid not in ya_asignados]
+            try:
+                with transaction.atomic():
+                    UsuarioRol.objects.bulk_create(nuevos)
+                insertados += len(nuevos)
+            except IntegrityError:
+                # Una asignación concurrente entre la consulta y el insert: fila
+                # por fila, para contar solo las que se insertaron de verdad
+                for asignacion in nuevos:
+                    asignacion.pk = None
+                    try:
+                        with transaction.atomic():
+                            UsuarioRol.objects.bulk_create([asignacion])
+                        insertados += 1
+                    except IntegrityError:
+                        pass
+            # bulk_create no dispara señales: se registran en el lote a mano
+            diferir_usuarios(uid for uid in trozo if uid not in ya_asignados)
+        return insertados
+
+    def _revocar(self, rol, usuario_ids):
+        eliminados = 0
+        for i in range(0, len(usuario_ids), TROZO):
+            trozo = usuario_ids[i:i + TROZO]
+            borrados, _ = UsuarioRol.objects.filter(rol=rol, usuario_id__in=trozo).delete()
+            eliminados += borrados
+        return eliminados
+
 # Listar y crear recursos
-class RecursoListCreateView(generics.ListCreateAPIView):
+class RecursoListCreateView(CamposDinamicosViewMixin, generics.ListCreateAPIView):
     queryset = Recurso.objects.all()
     serializer_class = RecursoSerializer
+    pagination_class = None  # listas cortas, se devuelven enteras
     permission_classes = [IsAuthenticated, IsAdminRole]
 
 # Ver, actualizar o eliminar un recurso
-class RecursoRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class RecursoRetrieveUpdateDestroyView(CamposDinamicosViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Recurso.objects.all()
     serializer_class = RecursoSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
@@ -152,8 +380,9 @@ class RecursoRolCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated, IsAdminRole]
 
 # Listar todos los recursos por rol
-class RecursosPorRolListView(generics.ListAPIView):
+class RecursosPorRolListView(CamposDinamicosViewMixin, generics.ListAPIView):
     serializer_class = RecursoSerializer
+    pagination_class = None  # listas cortas, se devuelven enteras
     permission_classes = [IsAuthenticated, IsAdminRole]
 
     def get_queryset(self):
@@ -0,0 +1,132 @@
+"""
+Latencia de un endpoint de lectura antes y durante una ráfaga de logins.
+
+Sirve para comprobar que el executor acotado de ``apps/autenticacion/login.py``
+aísla el costo de PBKDF2: con el servidor bajo ASGI (uvicorn, daphne) la
+latencia de las lecturas debería quedar parecida en las dos fases, y los logins
+que no entran en ``LOGIN_CONCURRENCIA + LOGIN_COLA_MAXIMA`` responder 503 al
+instante.
+
+Uso (con el servidor corriendo)::
+
+    python bench/login_rafaga.py --url http://127.0.0.1:8000 \\
+        --usuario admin --password secreto --logins 200 --lecturas 300
+
+El usuario tiene que poder leer ``--ruta``. Solo usa la librería estándar.
+
+PBKDF2 es CPU puro: los hilos del executor compiten por los núcleos con las
+lecturas. En una máquina de un núcleo (uvicorn, un worker) dio, en ms::
+
+    LOGIN_CONCURRENCIA   fase               p50    p95
+    4                    sin ráfaga         109    161
+    4                    durante la ráfaga  358   1078
+    1                    sin ráfaga         109    152
+    1                    durante la ráfaga  180    448
+
+Con 1 hilo la mayoría de los 200 logins respondió 503 al instante. Lo sano es
+``LOGIN_CONCURRENCIA`` por debajo de los núcleos disponibles.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+RUTA_LOGIN = '/api/autenticacion/login/'
+
+
+def _post_login(url, usuario, password):
+    cuerpo = json.dumps({'username': usuario, 'password': password}).encode()
+    pedido = urllib.request.Request(
+        url + RUTA_LOGIN, data=cuerpo, headers={'Content-Type': 'application/json'}, method='POST',
+    )
+    try:
+        with urllib.request.urlopen(pedido) as respuesta:
+            return respuesta.status, respuesta.headers.get_all('Set-Cookie') or []
+    except urllib.error.HTTPError as e:
+        return e.code, []
+    except OSError as e:
+        return type(e).__name__, []  # conexión rechazada o cortada por el servidor
+
+
+def _cookie_de_acceso(url, usuario, password):
+    codigo, cabeceras = _post_login(url, usuario, password)
+    if codigo != 200:
+        raise SystemExit(f"El login inicial respondió {codigo}.")
+    cookies = SimpleCookie()
+    for cabecera in cabeceras:
+        cookies.load(cabecera)
+    return f"access_token={cookies['access_token'].value}"
+
+
+def _leer(url, cookie):
+    pedido = urllib.request.Request(url, headers={'Cookie': cookie})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(pedido) as respuesta:
+            respuesta.read()
+    except urllib.error.HTTPError as e:
+        raise SystemExit(f"La lectura respondió {e.code}.")
+    return (time.perf_counter() - inicio) * 1000
+
+
+def _medir_lecturas(url, cookie, cantidad, hilos):
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(lambda _: _leer(url, cookie), range(cantidad)))
+
+
+def _resumen(nombre, latencias):
+    latencias = sorted(latencias)
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+    print(
+        f"{nombre:<18} n={len(latencias):<5} p50={percentil(0.50):7.1f} ms  "
+        f"p95={percentil(0.95):7.1f} ms  p99={percentil(0.99):7.1f} ms  "
+        f"media={statistics.mean(latencias):7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--usuario', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--ruta', default='/api/inventario/api/productos/', help="Endpoint de lectura")
+    parser.add_argument('--lecturas', type=int, default=300, help="Lecturas por fase")
+    parser.add_argument('--logins', type=int, default=200, help="Logins de la ráfaga")
+    parser.add_argument('--hilos', type=int, default=8, help="Clientes de lectura en paralelo")
+    parser.add_argument('--hilos-login', type=int, default=64, help="Clientes de login en paralelo")
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    cookie = _cookie_de_acceso(url, args.usuario, args.password)
+    lectura = url + args.ruta
+    _medir_lecturas(lectura, cookie, min(20, args.lecturas), args.hilos)  # calentar caches
+
+    _resumen('sin ráfaga', _medir_lecturas(lectura, cookie, args.lecturas, args.hilos))
+
+    codigos = {}
+    lock = threading.Lock()
+
+    def login(_):
+        codigo, _ = _post_login(url, args.usuario, args.password)
+        with lock:
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=args.hilos_login) as rafaga:
+        pendientes = [rafaga.submit(login, i) for i in range(args.logins)]
+        _resumen('durante la ráfaga', _medir_lecturas(lectura, cookie, args.lecturas, args.hilos))
+        for futuro in pendientes:
+            futuro.result()
+
+    print("logins:", ", ".join(f"{codigo}: {n}" for codigo, n in sorted(codigos.items(), key=str)))
+
+
+if __name__ == '__main__':
+    main()
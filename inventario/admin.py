@@ -5,4 +5,6 @@ from .models import *
 admin.site.register(TipoCategoria)
 admin.site.register(Marca)
 admin.site.register(Prestamo)
-admin.site.register(Producto)
\ No newline at end of file
+admin.site.register(Producto)
+admin.site.register(ImagenProducto)
+admin.site.register(CambioInventario)
\ No newline at end of file
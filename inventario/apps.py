@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
+
+
+# SQLite rompe al rehacer una tabla que aparece en un trigger: los triggers del
+# índice FTS se quitan antes de migrar y se restauran (reconstruyendo) después.
+# Si una migración falla no hay post_migrate: el comando migrate de esta app
+# los restaura igual
+def _quitar_fts(sender, using, plan=None, **kwargs):
+    from django.db import connections
+    from . import fts
+    if plan:
+        fts.quitar_triggers(connections[using])
+
+
+def _restaurar_fts(sender, using, **kwargs):
+    from django.db import connections
+    from . import fts
+    fts.restaurar_triggers(connections[using])
 
 
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        pre_migrate.connect(_quitar_fts, sender=self)
+        post_migrate.connect(_restaurar_fts, sender=self)
@@ -0,0 +1,174 @@
+"""
+Índice en memoria para autocompletar nombres de producto.
+
+Es un arreglo ordenado de ``(clave, prod_id)`` donde las claves son el nombre
+y el modelo normalizados (minúsculas, sin acentos) a partir de cada palabra,
+así "bola" encuentra "Martillo de bola". Buscar un prefijo es un ``bisect`` más
+recorrer las claves que empiezan con él.
+
+Las señales de ``signals.py`` aplican cada cambio de Producto al índice del
+proceso y renuevan una versión guardada en la cache de Django; los demás
+procesos ven la versión nueva y reconstruyen su índice en la siguiente
+consulta. Lo que no pasa por señales (``bulk_create``, ``QuerySet.update``)
+debe llamar a ``invalidar()``.
+
+La versión vence a los ``AUTOCOMPLETAR_CACHE_TIMEOUT`` segundos y el índice se
+reconstruye al menos con esa frecuencia: sin cache compartida (LocMemCache) ese
+es el máximo que un proceso tarda en ver los productos que cambió otro.
+"""
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Producto
+
+_CLAVE_VERSION = 'inventario:autocompletar:version'
+
+LIMITE = 10
+LIMITE_MAXIMO = 50
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower().strip()
+
+
+def _claves(nombre, modelo):
+    claves = set()
+    for texto in (nombre, modelo):
+        palabras = normalizar(texto).split()
+        for i in range(len(palabras)):
+            claves.add(' '.join(palabras[i:]))
+    return claves
+
+
+def etiqueta(nombre, modelo):
+    return f"{nombre} ({modelo})" if modelo else nombre
+
+
+class IndicePrefijos:
+    def __init__(self):
+        self._entradas = []     # [(clave, prod_id)] ordenado
+        self._claves = {}       # prod_id -> claves del producto
+        self._etiquetas = {}    # prod_id -> texto a mostrar
+        self._lock = threading.Lock()
+
+    def cargar(self, filas):
+        """Reemplaza el contenido con ``[(prod_id, nombre, modelo), ...]``."""
+        entradas, claves, etiquetas = [], {}, {}
+        for prod_id, nombre, modelo in filas:
+            claves[prod_id] = _claves(nombre, modelo)
+            etiquetas[prod_id] = etiqueta(nombre, modelo)
+            entradas.extend((clave, prod_id) for clave in claves[prod_id])
+        entradas.sort()
+        with self._lock:
+            self._entradas, self._claves, self._etiquetas = entradas, claves, etiquetas
+
+    def agregar(self, prod_id, nombre, modelo):
+        nuevas = _claves(nombre, modelo)
+        with self._lock:
+            self._quitar(prod_id)
+            for clave in nuevas:
+                insort(self._entradas, (clave, prod_id))
+            self._claves[prod_id] = nuevas
+            self._etiquetas[prod_id] = etiqueta(nombre, modelo)
+
+    def quitar(self, prod_id):
+        with self._lock:
+            self._quitar(prod_id)
+
+    def _quitar(self, prod_id):
+        for clave in self._claves.pop(prod_id, ()):
+            i = bisect_left(self._entradas, (clave, prod_id))
+            if i < len(self._entradas) and self._entradas[i] == (clave, prod_id):
+                del self._entradas[i]
+        self._etiquetas.pop(prod_id, None)
+
+    def buscar(self, prefijo, limite=LIMITE):
+        """``[{"id", "label"}]`` de hasta ``limite`` productos cuyo texto empieza con ``prefijo``."""
+        prefijo = normalizar(prefijo)
+        if not prefijo:
+            return []
+        resultado, vistos = [], set()
+        with self._lock:
+            i = bisect_left(self._entradas, (prefijo,))
+            while i < len(self._entradas) and len(resultado) < limite:
+                clave, prod_id = self._entradas[i]
+                if not clave.startswith(prefijo):
+                    break
+                if prod_id not in vistos:
+                    vistos.add(prod_id)
+                    resultado.append({"id": prod_id, "label": self._etiquetas[prod_id]})
+                i += 1
+        return resultado
+
+
+# ---- Índice del proceso ----
+
+_indice = IndicePrefijos()
+_version_local = None
+_cargado_en = None      # time.monotonic() de la última carga completa
+_lock_carga = threading.Lock()
+
+
+def _timeout():
+    return getattr(settings, 'AUTOCOMPLETAR_CACHE_TIMEOUT', 300)
+
+
+def _leer_version():
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, uuid.uuid4().hex[:12], _timeout())
+        version = cache.get(_CLAVE_VERSION)
+    return version
+
+
+def _vigente(version):
+    # Además de la versión, la edad: los cambios de este proceso renuevan la
+    # clave y sin este límite nunca vencería
+    return version == _version_local and time.monotonic() - _cargado_en < _timeout()
+
+
+def indice():
+    """El índice del proceso, reconstruido si otro proceso lo invalidó o si venció."""
+    global _version_local, _cargado_en
+    version = _leer_version()
+    if not _vigente(version):
+        with _lock_carga:
+            if not _vigente(version):
+                _indice.cargar(Producto.objects.values_list('prod_id', 'prod_nombre', 'prod_modelo').iterator())
+                _version_local, _cargado_en = version, time.monotonic()
+    return _indice
+
+
+def _renovar_version():
+    """Avisa a los demás procesos; este ya tiene el índice al día."""
+    global _version_local
+    anterior = cache.get(_CLAVE_VERSION)
+    version = uuid.uuid4().hex[:12]
+    cache.set(_CLAVE_VERSION, version, _timeout())
+    # Si otro proceso ya la había cambiado, a este índice le falta algo: se recarga
+    if _version_local is not None and anterior == _version_local:
+        _version_local = version
+
+
+def producto_guardado(prod_id, nombre, modelo):
+    if _version_local is not None:
+        _indice.agregar(prod_id, nombre, modelo)
+    _renovar_version()
+
+
+def producto_borrado(prod_id):
+    if _version_local is not None:
+        _indice.quitar(prod_id)
+    _renovar_version()
+
+
+def invalidar():
+    """Obliga a todos los procesos (este incluido) a reconstruir el índice."""
+    cache.set(_CLAVE_VERSION, uuid.uuid4().hex[:12], _timeout())
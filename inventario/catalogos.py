@@ -0,0 +1,107 @@
+"""
+Catálogos chicos (TipoCategoria, Marca, Prestamo) en memoria del proceso.
+
+Cada catálogo se carga entero una vez y se reutiliza para dos cosas:
+
+* validar los FK de ``ProductoSerializer`` (``CatalogoField``) sin consultar
+  la base en cada escritura;
+* responder los listados de los endpoints de catálogo (ver
+  ``CatalogoCacheMixin`` en ``views.py``), con un ETag que da 304 mientras
+  nada cambie.
+
+Como en ``autocompletar.py``, cada catálogo tiene una versión guardada en la
+cache de Django. Las señales de ``signals.py`` la renuevan al guardar o borrar
+una fila y los procesos recargan su copia en la siguiente consulta. Lo que no
+pasa por señales (``bulk_create``, ``QuerySet.update``) debe llamar a
+``invalidar(Modelo)``.
+
+La versión y la copia del proceso vencen a los ``CATALOGOS_CACHE_TIMEOUT``
+segundos: sin cache compartida (LocMemCache) ese es el máximo que un proceso
+tarda en ver lo que cambió otro.
+"""
+import copy
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from apps.autenticacion.cache import CacheLRU
+
+
+def _timeout():
+    return getattr(settings, 'CATALOGOS_CACHE_TIMEOUT', 300)
+
+
+# label del modelo -> Catalogo
+_locales = CacheLRU(16, ttl=_timeout())
+_lock_carga = threading.Lock()
+
+# (label, versión, URL) -> response.data de un listado
+respuestas = CacheLRU(getattr(settings, 'CATALOGOS_RESPUESTAS_MAXIMO', 256))
+
+
+class Catalogo:
+    """Foto de un catálogo en una versión: ``por_id`` es {pk: instancia}."""
+
+    def __init__(self, version, objetos):
+        self.version = version
+        self.por_id = {obj.pk: obj for obj in objetos}
+
+
+def _clave(modelo):
+    return f'inventario:catalogo:{modelo._meta.label_lower}:version'
+
+
+def version(modelo):
+    clave = _clave(modelo)
+    actual = cache.get(clave)
+    if actual is None:
+        cache.add(clave, uuid.uuid4().hex[:12], _timeout())
+        actual = cache.get(clave)
+    return actual
+
+
+def obtener(modelo):
+    """El catálogo de ``modelo`` en la versión vigente (lo recarga si cambió)."""
+    label = modelo._meta.label_lower
+    vigente = version(modelo)
+    catalogo = _locales.get(label)
+    if catalogo is None or catalogo.version != vigente:
+        with _lock_carga:
+            catalogo = _locales.get(label)
+            if catalogo is None or catalogo.version != vigente:
+                # La versión se leyó antes que las filas: si cambian mientras
+                # tanto, la siguiente consulta ve otra versión y recarga
+                catalogo = Catalogo(vigente, modelo._default_manager.all())
+                _locales.set(label, catalogo)
+    return catalogo
+
+
+def invalidar(modelo):
+    """Obliga a todos los procesos (este incluido) a recargar el catálogo."""
+    cache.set(_clave(modelo), uuid.uuid4().hex[:12], _timeout())
+    _locales.discard(modelo._meta.label_lower)
+
+
+class CatalogoField(serializers.PrimaryKeyRelatedField):
+    """
+    ``PrimaryKeyRelatedField`` que valida el id contra el catálogo en memoria.
+
+    Devuelve una copia de la instancia cacheada, así quien la modifique no
+    toca la del proceso. El ``queryset`` solo se usa para las opciones del
+    formulario de la API navegable.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = obtener(self.get_queryset().model).por_id.get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return copy.copy(obj)
@@ -0,0 +1,19 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from . import fts
+
+
+@register(Tags.database)
+def triggers_fts(app_configs, databases=None, **kwargs):
+    """Sin los triggers, el índice de búsqueda deja de seguir a los productos."""
+    avisos = []
+    for alias in databases or ():
+        faltan = fts.triggers_faltantes(connections[alias])
+        if faltan:
+            avisos.append(Warning(
+                f"Faltan triggers del índice {fts.TABLA} en '{alias}': {', '.join(faltan)}.",
+                hint="Una migración falló a mitad de camino; 'manage.py migrate' los restaura y reconstruye el índice.",
+                id='inventario.W001',
+            ))
+    return avisos
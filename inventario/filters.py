@@ -0,0 +1,52 @@
+import django_filters
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+from . import fts
+from .models import Producto
+
+
+class ProductoFilter(django_filters.FilterSet):
+    # Rangos numéricos: usan los índices de valor unitario y cantidad disponible
+    prod_valor_unitario__gte = django_filters.NumberFilter(field_name='prod_valor_unitario', lookup_expr='gte')
+    prod_valor_unitario__lte = django_filters.NumberFilter(field_name='prod_valor_unitario', lookup_expr='lte')
+    disponible__gt = django_filters.NumberFilter(field_name='prod_cantidad_disponible', lookup_expr='gt')
+    disponible__gte = django_filters.NumberFilter(field_name='prod_cantidad_disponible', lookup_expr='gte')
+    disponible__lte = django_filters.NumberFilter(field_name='prod_cantidad_disponible', lookup_expr='lte')
+
+    class Meta:
+        model = Producto
+        fields = [
+            "prod_estado",
+            "tipo_categoria__tipr_nombre",
+            "marca__marca_nombre",
+            "prestamo__pres_nombre",
+        ]
+
+
+class ProductoSearchFilter(SearchFilter):
+    """
+    ``?search=`` sobre el índice FTS5 de productos (ver inventario/fts.py).
+
+    Cada término se busca como prefijo de palabra en nombre, modelo, marca,
+    categoría y tipo de préstamo. Sin ``?ordering=`` los resultados salen por
+    relevancia (bm25). Si el índice no existe (otro motor), usa el
+    ``SearchFilter`` de DRF con ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        connection = connections[queryset.db]
+        if not fts.disponible(connection):
+            return super().filter_queryset(request, queryset, view)
+
+        expresion = fts.consulta(self.get_search_terms(request))
+        if expresion is None:
+            return queryset
+
+        if request.query_params.get(OrderingFilter.ordering_param):
+            return queryset.filter(pk__in=RawSQL(fts.sql_coincidencias(), [expresion]))
+        # Por relevancia: join con el índice para no repetir el MATCH por fila
+        # al calcular el puntaje (ni en el WHERE del cursor de la paginación)
+        queryset = fts.unir(queryset, expresion)
+        return queryset.annotate(fts_rango=RawSQL(fts.sql_rango(), [])).order_by("fts_rango", "pk")
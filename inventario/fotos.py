@@ -0,0 +1,83 @@
+"""
+Fotos de producto guardadas por contenido.
+
+Cada foto subida se identifica por el SHA-256 de sus bytes (calculado por
+trozos, sin cargar el archivo entero) y se guarda una sola vez en
+``productos/imagenes/<ab>/<sha256>.<ext>``. Varios productos con la misma foto
+apuntan al mismo archivo, y sus miniaturas (``imagenes.py``) también se
+comparten.
+
+``ImagenProducto`` lleva la cuenta de cuántos productos usan cada ruta. Las
+cuentas se cambian con UPDATE ... F() dentro de la transacción del save/delete
+del producto; cuando una llega a 0 se borra la fila y, al confirmar, el archivo
+y sus variantes.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+CARPETA = "productos/imagenes"
+TROZO = 64 * 1024
+
+
+def huella(archivo):
+    """SHA-256 hexadecimal del contenido de ``archivo`` (un File de Django)."""
+    sha = hashlib.sha256()
+    archivo.seek(0)
+    for trozo in archivo.chunks(TROZO):
+        sha.update(trozo)
+    archivo.seek(0)
+    return sha.hexdigest()
+
+
+def ruta_contenido(digest, nombre_original):
+    ext = os.path.splitext(nombre_original or "")[1].lower() or ".bin"
+    return f"{CARPETA}/{digest[:2]}/{digest}{ext}"
+
+
+def guardar(archivo, nombre_original):
+    """Suma una referencia a la foto y la escribe solo si no existía. Devuelve su ruta."""
+    ruta = ruta_contenido(huella(archivo), nombre_original)
+    # La referencia va antes que el archivo: así nadie lo borra mientras tanto
+    sumar_referencia(ruta)
+    if not default_storage.exists(ruta):
+        guardado = default_storage.save(ruta, archivo)
+        if guardado != ruta:
+            # Otra petición escribió el mismo contenido a la vez: sobra esta copia
+            default_storage.delete(guardado)
+    return ruta
+
+
+def sumar_referencia(ruta, cantidad=1):
+    from .models import ImagenProducto
+
+    if ImagenProducto.objects.filter(ruta=ruta).update(referencias=F("referencias") + cantidad):
+        return
+    try:
+        with transaction.atomic():
+            ImagenProducto.objects.create(ruta=ruta, referencias=cantidad)
+    except IntegrityError:
+        ImagenProducto.objects.filter(ruta=ruta).update(referencias=F("referencias") + cantidad)
+
+
+def quitar_referencia(ruta):
+    """Resta una referencia; si era la última, borra la foto al confirmar."""
+    from .models import ImagenProducto
+
+    ImagenProducto.objects.filter(ruta=ruta, referencias__gt=0).update(referencias=F("referencias") - 1)
+    borradas, _ = ImagenProducto.objects.filter(ruta=ruta, referencias=0).delete()
+    if borradas:
+        transaction.on_commit(lambda: _borrar_archivos(ruta))
+
+
+def _borrar_archivos(ruta):
+    from . import imagenes
+    from .models import ImagenProducto
+
+    if ImagenProducto.objects.filter(ruta=ruta).exists():
+        return  # se volvió a subir la misma foto
+    for archivo in [ruta] + [imagenes.ruta_variante(ruta, nombre) for nombre in imagenes.TAMANOS]:
+        default_storage.delete(archivo)
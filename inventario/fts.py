@@ -0,0 +1,199 @@
+"""
+Índice de búsqueda de texto completo (FTS5, solo SQLite) para Producto.
+
+La tabla virtual ``productos_fts`` guarda, por ``rowid = prod_id``, el nombre y
+modelo del producto junto con los nombres de su marca, categoría y tipo de
+préstamo (desnormalizados para no hacer joins al buscar). Triggers en
+``productos``, ``marca``, ``tipo_categoria`` y ``prestamo`` la mantienen al día,
+así que también cubren ``bulk_create`` y ``QuerySet.update``.
+
+Cuando SQLite rehace una tabla en una migración, los triggers que la mencionan
+rompen el ``RENAME``; por eso se quitan en ``pre_migrate`` y ``restaurar_triggers``
+los vuelve a crear (y reconstruye el índice) al terminar ``migrate``, también si
+una migración falla (ver management/commands/migrate.py). ``check --database
+default`` avisa si faltan.
+En otros motores, o si SQLite no trae FTS5, no se crea nada y la búsqueda usa
+el ``SearchFilter`` normal.
+"""
+from django.db import DatabaseError
+
+TABLA = "productos_fts"
+
+# Pesos de bm25 por columna, en el orden de la tabla
+PESOS = (10.0, 5.0, 2.0, 2.0, 1.0)
+
+_CREAR_TABLA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5(
+    prod_nombre, prod_modelo, marca_nombre, tipr_nombre, pres_nombre,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+# Fila del índice para los productos que cumplan {where}
+_SELECT_FILAS = """
+SELECT p.prod_id, p.prod_nombre, COALESCE(p.prod_modelo, ''),
+       COALESCE(m.marca_nombre, ''), COALESCE(t.tipr_nombre, ''), COALESCE(pr.pres_nombre, '')
+FROM productos p
+LEFT JOIN marca m ON m.marca_id = p.marca_marca_id
+LEFT JOIN tipo_categoria t ON t.tipr_id = p.tipo_categoria_tipr_id
+LEFT JOIN prestamo pr ON pr."pres_ID" = p."prestamo_pres_ID"
+WHERE {where}
+"""
+
+_INSERTAR = (
+    f"INSERT INTO {TABLA}(rowid, prod_nombre, prod_modelo, marca_nombre, tipr_nombre, pres_nombre) "
+    + _SELECT_FILAS
+)
+
+_TRIGGERS = {
+    "productos_fts_ai": f"""
+        AFTER INSERT ON productos BEGIN
+            {_INSERTAR.format(where="p.prod_id = new.prod_id")};
+        END""",
+    # Solo columnas indexadas: prestar/devolver no tocan el índice
+    "productos_fts_au": f"""
+        AFTER UPDATE OF prod_nombre, prod_modelo, marca_marca_id, tipo_categoria_tipr_id, "prestamo_pres_ID"
+        ON productos BEGIN
+            DELETE FROM {TABLA} WHERE rowid = old.prod_id;
+            {_INSERTAR.format(where="p.prod_id = new.prod_id")};
+        END""",
+    "productos_fts_ad": f"""
+        AFTER DELETE ON productos BEGIN
+            DELETE FROM {TABLA} WHERE rowid = old.prod_id;
+        END""",
+    "marca_fts_au": f"""
+        AFTER UPDATE OF marca_nombre ON marca BEGIN
+            UPDATE {TABLA} SET marca_nombre = new.marca_nombre
+            WHERE rowid IN (SELECT prod_id FROM productos WHERE marca_marca_id = new.marca_id);
+        END""",
+    "tipo_categoria_fts_au": f"""
+        AFTER UPDATE OF tipr_nombre ON tipo_categoria BEGIN
+            UPDATE {TABLA} SET tipr_nombre = new.tipr_nombre
+            WHERE rowid IN (SELECT prod_id FROM productos WHERE tipo_categoria_tipr_id = new.tipr_id);
+        END""",
+    "prestamo_fts_au": f"""
+        AFTER UPDATE OF pres_nombre ON prestamo BEGIN
+            UPDATE {TABLA} SET pres_nombre = new.pres_nombre
+            WHERE rowid IN (SELECT prod_id FROM productos WHERE "prestamo_pres_ID" = new."pres_ID");
+        END""",
+}
+
+# alias de conexión -> bool
+_disponible = {}
+
+
+def soportado(connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Algunas builds cargan FTS5 sin declararlo en las opciones de compilación
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp._prueba_fts5 USING fts5(x)")
+            cursor.execute("DROP TABLE temp._prueba_fts5")
+            return True
+        except DatabaseError:
+            return False
+
+
+def disponible(connection):
+    """True si la búsqueda puede usar el índice FTS en esta conexión."""
+    if connection.alias not in _disponible:
+        _disponible[connection.alias] = (
+            connection.vendor == "sqlite" and TABLA in connection.introspection.table_names()
+        )
+    return _disponible[connection.alias]
+
+
+def crear_indice(connection):
+    """Crea y llena la tabla (migración 0005); los triggers van en ``post_migrate``."""
+    if not soportado(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_CREAR_TABLA)
+    reconstruir(connection)
+
+
+def triggers_faltantes(connection):
+    """Nombres de los triggers que deberían existir y no están."""
+    if connection.vendor != "sqlite" or TABLA not in connection.introspection.table_names():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+    return [nombre for nombre in _TRIGGERS if nombre not in existentes]
+
+
+def restaurar_triggers(connection):
+    """Recrea los triggers que falten; si faltaba alguno, reconstruye el índice."""
+    if not triggers_faltantes(connection):
+        return
+    _crear_triggers(connection)
+    reconstruir(connection)
+
+
+def quitar_triggers(connection):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for nombre in _TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+
+def _crear_triggers(connection):
+    with connection.cursor() as cursor:
+        for nombre, cuerpo in _TRIGGERS.items():
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}")
+    _disponible.pop(connection.alias, None)
+
+
+def eliminar_indice(connection):
+    if connection.vendor != "sqlite":
+        return
+    quitar_triggers(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+    _disponible.pop(connection.alias, None)
+
+
+def reconstruir(connection):
+    """Vuelve a llenar el índice desde las tablas."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA}")
+        cursor.execute(_INSERTAR.format(where="1"))
+
+
+def consulta(terminos):
+    """Expresión MATCH: cada término como prefijo y todos obligatorios, o None."""
+    partes = []
+    for termino in terminos:
+        # Entre comillas FTS5 no interpreta operadores; las comillas internas se duplican
+        limpio = termino.strip().replace('"', '""')
+        if limpio:
+            partes.append(f'"{limpio}"*')
+    return " ".join(partes) or None
+
+
+def sql_coincidencias():
+    """SQL de los prod_id que cumplen la búsqueda (un parámetro: la expresión)."""
+    return f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s"
+
+
+def unir(queryset, expresion):
+    """
+    ``queryset`` unido a las filas del índice que cumplen la búsqueda. El MATCH
+    se evalúa una sola vez y cada fila del índice trae su puntaje (``sql_rango``).
+    """
+    return queryset.extra(
+        tables=[TABLA],
+        where=[f"{TABLA}.rowid = productos.prod_id", f"{TABLA} MATCH %s"],
+        params=[expresion],
+    )
+
+
+def sql_rango():
+    """SQL del puntaje bm25 de cada fila, en un queryset pasado por ``unir`` (menor = mejor)."""
+    pesos = ", ".join(str(p) for p in PESOS)
+    return f"bm25({TABLA}, {pesos})"
@@ -0,0 +1,116 @@
+"""
+Variantes WebP de ``Producto.prod_foto``.
+
+Al guardar un producto con una foto nueva, la señal de ``signals.py`` encola
+``generar_variantes`` en un ThreadPoolExecutor propio (``IMAGENES_HILOS``): la
+subida responde en cuanto el original queda guardado y las miniaturas se
+calculan después. Cada variante es un WebP de ``TAMANOS[nombre]`` píxeles en su
+lado mayor, junto al original en ``<carpeta>/variantes/``.
+
+El resultado se escribe en ``prod_foto_variantes`` de todos los productos cuya
+``prod_foto`` sigue siendo ese archivo. Como las fotos se guardan por contenido
+(``fotos.py``), la misma imagen se procesa una sola vez. Hasta que esté listo,
+el serializer usa el original.
+
+Con ``IMAGENES_HILOS = 0`` se generan en el mismo hilo (útil en tests).
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import sincronizacion
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+TAMANOS = {
+    "thumb": 160,
+    "md": 640,
+}
+CALIDAD_WEBP = 80
+
+_hilos = getattr(settings, "IMAGENES_HILOS", 2)
+_executor = ThreadPoolExecutor(max_workers=_hilos, thread_name_prefix="imagenes") if _hilos > 0 else None
+
+
+def ruta_variante(origen, nombre):
+    carpeta, archivo = os.path.split(origen)
+    base = os.path.splitext(archivo)[0]
+    return os.path.join(carpeta, "variantes", f"{base}_{nombre}.webp")
+
+
+def _webp(imagen, lado):
+    from PIL import Image
+
+    copia = imagen.copy()
+    copia.thumbnail((lado, lado), Image.LANCZOS)
+    buffer = io.BytesIO()
+    copia.save(buffer, "WEBP", quality=CALIDAD_WEBP, method=4)
+    return buffer.getvalue()
+
+
+def generar_variantes(prod_id, origen):
+    """
+    Genera las variantes de ``origen`` (si no existen ya) y las registra en
+    todos los productos que siguen usando esa foto.
+    """
+    rutas = {nombre: ruta_variante(origen, nombre) for nombre in TAMANOS}
+    # Las fotos se guardan por contenido: si otro producto ya tiene la misma, se reutilizan
+    if not all(default_storage.exists(ruta) for ruta in rutas.values()):
+        from PIL import Image, ImageOps
+
+        with default_storage.open(origen, "rb") as archivo:
+            imagen = Image.open(archivo)
+            imagen = ImageOps.exif_transpose(imagen)
+            imagen = imagen.convert("RGBA" if imagen.mode in ("RGBA", "LA", "P") else "RGB")
+
+        for nombre, lado in TAMANOS.items():
+            if default_storage.exists(rutas[nombre]):
+                default_storage.delete(rutas[nombre])
+            rutas[nombre] = default_storage.save(rutas[nombre], ContentFile(_webp(imagen, lado)))
+
+    variantes = {"origen": origen, **rutas}
+    # update(): no dispara señales ni pisa una foto subida mientras tanto
+    usan = Producto.objects.filter(prod_foto=origen)
+    with transaction.atomic():
+        ids = list(usan.values_list("pk", flat=True))
+        usan.update(prod_foto_variantes=variantes, actualizado_en=timezone.now())
+        sincronizacion.registrar(Producto, ids)
+    return variantes
+
+
+def _generar(prod_id, origen):
+    try:
+        generar_variantes(prod_id, origen)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de %s (producto %s)", origen, prod_id)
+
+
+def _tarea(prod_id, origen):
+    # Los hilos del executor no pasan por request_started/finished
+    close_old_connections()
+    try:
+        _generar(prod_id, origen)
+    finally:
+        close_old_connections()
+
+
+def encolar(prod_id, origen):
+    if _executor is None:
+        _generar(prod_id, origen)
+    else:
+        _executor.submit(_tarea, prod_id, origen)
+
+
+def pendiente(producto):
+    """True si la foto actual del producto todavía no tiene variantes."""
+    if not producto.prod_foto:
+        return False
+    return (producto.prod_foto_variantes or {}).get("origen") != producto.prod_foto.name
@@ -0,0 +1,295 @@
+"""
+Importación masiva de productos desde CSV o XLSX.
+
+La usan el comando ``importar_productos`` y la acción ``productos/importar/``.
+Las filas se leen de a una (``csv.DictReader`` u openpyxl en modo read-only) y
+se procesan por lotes; por cada lote:
+
+1. se validan las filas (un error en una fila no aborta el resto);
+2. marca, categoría y préstamo se resuelven por nombre con un mapa nombre -> id
+   leído una vez de la base (no de ``catalogos.py``, que puede estar atrasado en
+   este proceso y haría crear duplicados); los que no existen se crean con un
+   ``bulk_create`` por catálogo;
+3. los productos se insertan con ``bulk_create``.
+
+Cada lote se confirma por separado. Si el archivo resulta ilegible a mitad de
+camino (``ArchivoIlegible``), los lotes anteriores quedan creados y
+``resumen()`` dice cuántos.
+
+``bulk_create`` no dispara señales: al terminar se invalidan el autocompletar y
+los catálogos, y los ids nuevos se registran en el feed de sincronización. El
+índice FTS se mantiene solo (triggers).
+
+Columnas: prod_nombre, marca, tipo_categoria, prestamo, prod_valor_unitario
+(obligatorias), prod_modelo, tipo_prestamos, prod_estado, prod_cantidad_total,
+prod_cantidad_disponible, prod_cantidad_prestada y tipo_prestamo (para los
+préstamos que haya que crear).
+"""
+import csv
+import io
+import zipfile
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import autocompletar, catalogos, sincronizacion
+from .models import Marca, Prestamo, Producto, TipoCategoria
+
+COLUMNAS = ('prod_nombre', 'prod_modelo', 'tipo_prestamos', 'prod_estado')
+CANTIDADES = ('prod_cantidad_total', 'prod_cantidad_disponible', 'prod_cantidad_prestada')
+
+# columna -> (modelo, campo del nombre)
+CATALOGOS = {
+    'marca': (Marca, 'marca_nombre'),
+    'tipo_categoria': (TipoCategoria, 'tipr_nombre'),
+    'prestamo': (Prestamo, 'pres_nombre'),
+}
+
+# Se cuentan todas, pero solo se devuelven las primeras
+MAXIMO_ERRORES = 1000
+
+
+class FormatoNoSoportado(Exception):
+    pass
+
+
+class ArchivoIlegible(Exception):
+    """El archivo no se pudo decodificar o no es un CSV/XLSX válido."""
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # Excel guarda los enteros como float
+    return str(valor).strip()
+
+
+def filas_csv(archivo_texto):
+    """``(numero, fila)`` de un CSV abierto en modo texto; la fila 1 es la cabecera."""
+    lector = csv.DictReader(archivo_texto)
+    try:
+        yield from enumerate(lector, start=2)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ArchivoIlegible(f"No se pudo leer el CSV cerca de la línea {lector.line_num + 1}: {e}") from e
+
+
+def filas_xlsx(archivo):
+    """``(numero, fila)`` de la primera hoja de un XLSX, sin cargarlo entero."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise FormatoNoSoportado("Para importar .xlsx hay que instalar openpyxl.")
+
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ArchivoIlegible(f"No es un archivo XLSX válido: {e}") from e
+    try:
+        valores = libro.active.iter_rows(values_only=True)
+        cabecera = [_texto(c) for c in next(valores, ())]
+        for numero, fila in enumerate(valores, start=2):
+            if any(v is not None for v in fila):
+                yield numero, dict(zip(cabecera, fila))
+    finally:
+        libro.close()
+
+
+def filas(archivo, nombre='', formato=None, encoding='utf-8-sig'):
+    """Filas de un archivo binario; el formato sale de ``formato`` o de la extensión."""
+    formato = (formato or nombre.rsplit('.', 1)[-1]).lower()
+    if formato == 'xlsx':
+        return filas_xlsx(archivo)
+    if formato == 'csv':
+        return filas_csv(io.TextIOWrapper(archivo, encoding=encoding, newline=''))
+    raise FormatoNoSoportado(f"Formato no soportado: '{formato}'. Usa csv o xlsx.")
+
+
+def _clave(nombre):
+    return nombre.strip().casefold()
+
+
+def _limpiar_fila(fila):
+    """Devuelve (datos, nombres de catálogo) o lanza ValidationError con los errores de la fila."""
+    errores = {}
+    datos = {}
+    for nombre in COLUMNAS:
+        valor = _texto(fila.get(nombre))
+        field = Producto._meta.get_field(nombre)
+        if valor == '':
+            if nombre == 'prod_nombre':
+                errores[nombre] = ['Es obligatorio.']
+            else:
+                datos[nombre] = None
+            continue
+        try:
+            datos[nombre] = field.clean(valor, None)
+        except ValidationError as e:
+            errores[nombre] = e.messages
+
+    valor = _texto(fila.get('prod_valor_unitario')).replace(',', '.')
+    try:
+        datos['prod_valor_unitario'] = Producto._meta.get_field('prod_valor_unitario').clean(valor, None)
+        if datos['prod_valor_unitario'] < 0:
+            errores['prod_valor_unitario'] = ['No puede ser negativo.']
+    except ValidationError as e:
+        errores['prod_valor_unitario'] = e.messages
+
+    cantidades = {}
+    for nombre in CANTIDADES:
+        valor = _texto(fila.get(nombre))
+        if valor == '':
+            continue
+        try:
+            cantidades[nombre] = Producto._meta.get_field(nombre).clean(valor, None)
+        except ValidationError as e:
+            errores[nombre] = e.messages
+
+    nombres = {}
+    for columna, (modelo, campo) in CATALOGOS.items():
+        valor = _texto(fila.get(columna))
+        if valor == '':
+            errores[columna] = ['Es obligatorio.']
+        elif len(valor) > modelo._meta.get_field(campo).max_length:
+            errores[columna] = ['Nombre demasiado largo.']
+        else:
+            nombres[columna] = valor
+
+    if errores:
+        raise ValidationError(errores)
+
+    # Mismas reglas que ProductoSerializer.validate; si solo viene el total,
+    # lo que no está prestado se toma como disponible
+    pres = cantidades.get('prod_cantidad_prestada', 0)
+    if 'prod_cantidad_disponible' in cantidades:
+        disp = cantidades['prod_cantidad_disponible']
+    else:
+        disp = max(cantidades.get('prod_cantidad_total', 0) - pres, 0)
+    if pres > cantidades.get('prod_cantidad_total', disp + pres):
+        raise ValidationError({'prod_cantidad_prestada': ['No puede superar el total.']})
+    total = disp + pres
+    datos.update(prod_cantidad_disponible=disp, prod_cantidad_prestada=pres, prod_cantidad_total=total)
+
+    if datos['prod_estado'] in (None, ''):
+        if total == 0:
+            datos['prod_estado'] = 'sin_stock'
+        elif disp == 0:
+            datos['prod_estado'] = 'agotado'
+        else:
+            datos['prod_estado'] = 'activo'
+
+    nombres['tipo_prestamo'] = _texto(fila.get('tipo_prestamo'))
+    return datos, nombres
+
+
+class ImportadorProductos:
+    def __init__(self, lote=1000):
+        self.lote = lote
+        self.creados = 0
+        self.con_errores = 0
+        self.errores = []   # [{"fila": n, "errores": {...}}]
+        self._ids = None    # columna -> {nombre normalizado: id}
+        self._catalogos_nuevos = set()
+
+    def importar(self, filas):
+        """Importa desde un iterable de ``(numero, fila)`` y devuelve el resumen."""
+        if self._ids is None:
+            self._ids = {
+                columna: {_clave(nombre): pk for pk, nombre in modelo.objects.values_list('pk', campo)}
+                for columna, (modelo, campo) in CATALOGOS.items()
+            }
+        filas = iter(filas)
+        try:
+            while True:
+                lote = list(islice(filas, self.lote))
+                if not lote:
+                    break
+                self._procesar_lote(lote)
+        finally:
+            if self.creados:
+                autocompletar.invalidar()
+            for modelo in self._catalogos_nuevos:
+                catalogos.invalidar(modelo)
+        return self.resumen()
+
+    def resumen(self):
+        errores = sorted(self.errores, key=lambda e: e["fila"])
+        return {"creados": self.creados, "con_errores": self.con_errores, "errores": errores}
+
+    def _error(self, numero, errores):
+        self.con_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append({"fila": numero, "errores": errores})
+
+    def _procesar_lote(self, lote):
+        validas = []  # (numero, datos, nombres)
+        for numero, fila in lote:
+            try:
+                datos, nombres = _limpiar_fila(fila)
+            except ValidationError as e:
+                self._error(numero, e.message_dict)
+                continue
+            validas.append((numero, datos, nombres))
+        if not validas:
+            return
+
+        with transaction.atomic():
+            self._crear_catalogos(validas)
+            productos = [
+                Producto(
+                    **datos,
+                    marca_id=self._ids['marca'][_clave(nombres['marca'])],
+                    tipo_categoria_id=self._ids['tipo_categoria'][_clave(nombres['tipo_categoria'])],
+                    prestamo_id=self._ids['prestamo'][_clave(nombres['prestamo'])],
+                )
+                for _, datos, nombres in validas
+            ]
+            try:
+                with transaction.atomic():
+                    Producto.objects.bulk_create(productos)
+                creados = productos
+            except IntegrityError:
+                # Alguna fila choca con una restricción de la base: fila por fila
+                creados = []
+                for (numero, *_), producto in zip(validas, productos):
+                    producto.pk = None
+                    try:
+                        with transaction.atomic():
+                            Producto.objects.bulk_create([producto])
+                        creados.append(producto)
+                    except IntegrityError as e:
+                        self._error(numero, {"non_field_errors": [str(e)]})
+            self.creados += len(creados)
+            ids = [p.pk for p in creados if p.pk is not None]
+            sincronizacion.registrar(Producto, ids, nuevos=True)
+
+    def _crear_catalogos(self, validas):
+        for columna, (modelo, campo) in CATALOGOS.items():
+            conocidos = self._ids[columna]
+            nuevos = {}
+            for _, _, nombres in validas:
+                clave = _clave(nombres[columna])
+                if clave not in conocidos and clave not in nuevos:
+                    datos = {campo: nombres[columna]}
+                    if modelo is Prestamo:
+                        datos['tipo_prestamo'] = nombres['tipo_prestamo']
+                    nuevos[clave] = modelo(**datos)
+            if not nuevos:
+                continue
+            modelo.objects.bulk_create(nuevos.values())
+            if any(obj.pk is None for obj in nuevos.values()):
+                # Motores sin RETURNING en inserciones masivas
+                ids = {
+                    _clave(nombre): pk for pk, nombre in modelo.objects.filter(
+                        **{f"{campo}__in": [getattr(o, campo) for o in nuevos.values()]}
+                    ).values_list('pk', campo)
+                }
+                for clave, obj in nuevos.items():
+                    obj.pk = ids[clave]
+            for clave, obj in nuevos.items():
+                conocidos[clave] = obj.pk
+            self._catalogos_nuevos.add(modelo)
+            sincronizacion.registrar(modelo, [obj.pk for obj in nuevos.values()], nuevos=True)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.importacion import ArchivoIlegible, FormatoNoSoportado, ImportadorProductos, filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos desde un CSV o XLSX (prod_nombre, marca, tipo_categoria, prestamo, "
+        "prod_valor_unitario, ...). Marcas, categorías y préstamos que no existan se crean. "
+        "Las filas con errores se reportan sin abortar la carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV o XLSX")
+        parser.add_argument('--formato', choices=['csv', 'xlsx'], default=None,
+                            help="Por defecto se toma de la extensión")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por lote de inserción")
+        parser.add_argument('--encoding', default='utf-8-sig', help="Solo para CSV")
+
+    def handle(self, *args, **options):
+        importador = ImportadorProductos(lote=options['lote'])
+        try:
+            with open(options['archivo'], 'rb') as f:
+                resumen = importador.importar(
+                    filas(f, options['archivo'], options['formato'], options['encoding'])
+                )
+        except (OSError, FormatoNoSoportado) as e:
+            raise CommandError(str(e))
+        except ArchivoIlegible as e:
+            raise CommandError(f"{e} ({importador.creados} productos ya creados en lotes anteriores).")
+
+        for error in resumen['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['errores']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['creados']} productos creados, {resumen['con_errores']} filas con errores."
+        ))
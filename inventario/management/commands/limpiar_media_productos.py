@@ -0,0 +1,145 @@
+import os
+import time
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from inventario import fotos, imagenes, sincronizacion
+from inventario.models import ImagenProducto, Producto
+
+CARPETA = "productos"
+CUARENTENA = "cuarentena"
+
+
+def _recorrer(raiz, relativa=""):
+    """Genera (ruta relativa a MEDIA_ROOT, mtime) de cada archivo, sin listar todo en memoria."""
+    with os.scandir(os.path.join(raiz, relativa)) as entradas:
+        for entrada in entradas:
+            ruta = f"{relativa}/{entrada.name}" if relativa else entrada.name
+            if entrada.is_dir(follow_symlinks=False):
+                yield from _recorrer(raiz, ruta)
+            elif entrada.is_file(follow_symlinks=False):
+                yield ruta, entrada.stat(follow_symlinks=False).st_mtime
+
+
+def _referenciados():
+    """Rutas de media que usa algún producto: la foto y sus variantes."""
+    rutas = set()
+    filas = Producto.objects.exclude(prod_foto="").exclude(prod_foto__isnull=True)
+    for foto, variantes in filas.values_list("prod_foto", "prod_foto_variantes").iterator(chunk_size=2000):
+        rutas.add(foto)
+        for nombre, ruta in (variantes or {}).items():
+            if nombre != "origen":
+                rutas.add(ruta)
+    return rutas
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca archivos en media/productos/ que ningún producto usa (fotos reemplazadas, "
+        "subidas abandonadas) y los lista, borra o mueve a media/cuarentena/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modo", choices=["listar", "borrar", "cuarentena"], default="listar",
+            help="Qué hacer con los huérfanos (por defecto solo listarlos).",
+        )
+        parser.add_argument(
+            "--antiguedad", type=int, default=60,
+            help="Ignora archivos modificados hace menos de N minutos (subidas y variantes en curso).",
+        )
+        parser.add_argument("--lote", type=int, default=500, help="Archivos por lote al borrar o mover.")
+        parser.add_argument(
+            "--reubicar", action="store_true",
+            help="Mueve antes las fotos en uso de productos/tmp/ a la carpeta de su producto.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            raiz = default_storage.path("")
+        except NotImplementedError:
+            raise CommandError("El storage de media no es local; este comando necesita recorrer el disco.")
+        if not os.path.isdir(os.path.join(raiz, CARPETA)):
+            self.stdout.write("No hay carpeta de productos en media.")
+            return
+
+        if options["reubicar"]:
+            self._reubicar(raiz)
+
+        referenciados = _referenciados()
+        limite = time.time() - options["antiguedad"] * 60
+        modo = options["modo"]
+
+        huerfanos, lote = 0, []
+        for ruta, mtime in _recorrer(raiz, CARPETA):
+            if ruta in referenciados or mtime > limite:
+                continue
+            huerfanos += 1
+            if modo == "listar":
+                self.stdout.write(ruta)
+                continue
+            lote.append(ruta)
+            if len(lote) >= options["lote"]:
+                self._aplicar(raiz, lote, modo)
+                lote = []
+        if lote:
+            self._aplicar(raiz, lote, modo)
+
+        acciones = {"listar": "encontrados", "borrar": "borrados", "cuarentena": "movidos a cuarentena"}
+        self.stdout.write(self.style.SUCCESS(f"{huerfanos} archivos huérfanos {acciones[modo]}."))
+
+    def _aplicar(self, raiz, rutas, modo):
+        for ruta in rutas:
+            origen = os.path.join(raiz, ruta)
+            if modo == "borrar":
+                try:
+                    os.remove(origen)
+                except FileNotFoundError:
+                    pass
+            else:
+                destino = os.path.join(raiz, CUARENTENA, ruta)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                os.replace(origen, destino)
+        self.stdout.write(f"  lote de {len(rutas)} procesado")
+
+    def _reubicar(self, raiz):
+        """Pasa las fotos en uso de productos/tmp/ al almacenamiento por contenido (fotos.py)."""
+        prefijo = f"{CARPETA}/tmp/"
+        movidas = 0
+        viejas = (
+            Producto.objects.filter(prod_foto__startswith=prefijo)
+            .values_list("prod_foto", flat=True).distinct()
+        )
+        for foto in list(viejas):
+            origen = os.path.join(raiz, foto)
+            if not os.path.isfile(origen):
+                continue
+            with File(open(origen, "rb")) as archivo:
+                nueva = fotos.ruta_contenido(fotos.huella(archivo), foto)
+            destino = os.path.join(raiz, nueva)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+            with transaction.atomic():
+                ids = list(Producto.objects.filter(prod_foto=foto).values_list("pk", flat=True))
+                usos = Producto.objects.filter(prod_foto=foto).update(
+                    prod_foto=nueva, prod_foto_variantes={}, actualizado_en=timezone.now()
+                )
+                sincronizacion.registrar(Producto, ids)
+                ImagenProducto.objects.filter(ruta=foto).delete()
+                fotos.sumar_referencia(nueva, usos)
+                if os.path.exists(destino):
+                    os.remove(origen)  # ya estaba guardada esa misma imagen
+                else:
+                    os.replace(origen, destino)
+            movidas += 1
+
+            # Las variantes viejas quedaron en tmp/variantes/ (huérfanas): se regeneran
+            try:
+                imagenes.generar_variantes(None, nueva)
+            except Exception as e:
+                self.stderr.write(f"{nueva}: no se pudieron generar las variantes ({e}).")
+        self.stdout.write(f"{movidas} fotos movidas desde {prefijo}.")
@@ -0,0 +1,22 @@
+from django.core.management.commands.migrate import Command as MigrateCommand
+from django.db import DatabaseError, connections
+
+from inventario import fts
+
+
+class Command(MigrateCommand):
+    """
+    ``migrate`` de Django, pero los triggers del índice FTS (que ``pre_migrate``
+    quita) se restauran aunque una migración falle a mitad de camino:
+    ``post_migrate`` solo se envía si todo salió bien.
+    """
+
+    def handle(self, *args, **options):
+        try:
+            return super().handle(*args, **options)
+        finally:
+            try:
+                fts.restaurar_triggers(connections[options['database']])
+            except DatabaseError as e:
+                # No tapar el error de la migración; "check --database" lo vuelve a avisar
+                self.stderr.write(f"No se pudieron restaurar los triggers de {fts.TABLA}: {e}")
@@ -0,0 +1,60 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import migrations
+
+MAXIMO_VALOR = Decimal('9999999999.99')  # max_digits=12, decimal_places=2
+
+
+def _decimal(valor):
+    if valor is None:
+        return None
+    try:
+        d = Decimal(str(valor).strip().replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return None
+    if not d.is_finite() or d < 0:
+        return None
+    return d
+
+
+def _entero(valor):
+    d = _decimal(valor)
+    return int(d) if d is not None else 0
+
+
+def limpiar(apps, schema_editor):
+    """Deja los textos listos para convertir las columnas a número.
+
+    Lo que no es numérico o es negativo pasa a 0, el valor unitario se redondea
+    a 2 decimales y el total se recalcula como disponible + prestada.
+    """
+    Producto = apps.get_model('inventario', 'Producto')
+    campos = ['prod_valor_unitario', 'prod_cantidad_disponible', 'prod_cantidad_prestada', 'prod_cantidad_total']
+    cambiados = []
+    for producto in Producto.objects.only('prod_id', *campos).iterator(chunk_size=500):
+        valor = _decimal(producto.prod_valor_unitario) or Decimal('0')
+        valor = min(valor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), MAXIMO_VALOR)
+        disp = _entero(producto.prod_cantidad_disponible)
+        prest = _entero(producto.prod_cantidad_prestada)
+        nuevos = {
+            'prod_valor_unitario': format(valor, 'f'),
+            'prod_cantidad_disponible': str(disp),
+            'prod_cantidad_prestada': str(prest),
+            'prod_cantidad_total': str(disp + prest),
+        }
+        if any(getattr(producto, c) != v for c, v in nuevos.items()):
+            for c, v in nuevos.items():
+                setattr(producto, c, v)
+            cambiados.append(producto)
+    Producto.objects.bulk_update(cambiados, campos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_alter_producto_prod_foto'),
+    ]
+
+    operations = [
+        migrations.RunPython(limpiar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:16
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_limpiar_numeros_producto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='prod_cantidad_disponible',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='prod_cantidad_prestada',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='prod_cantidad_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='prod_valor_unitario',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['prod_valor_unitario'], name='producto_valor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['prod_cantidad_disponible'], name='producto_disponible_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('prod_valor_unitario__gte', 0)), name='producto_valor_no_negativo'),
+        ),
+        migrations.AddConstraint(
+            model_name='producto',
+            constraint=models.CheckConstraint(condition=models.Q(('prod_cantidad_total', django.db.models.expressions.CombinedExpression(models.F('prod_cantidad_disponible'), '+', models.F('prod_cantidad_prestada')))), name='producto_cantidades_cuadran'),
+        ),
+    ]
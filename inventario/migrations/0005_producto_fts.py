@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def crear(apps, schema_editor):
+    from inventario import fts
+    fts.crear_indice(schema_editor.connection)
+
+
+def eliminar(apps, schema_editor):
+    from inventario import fts
+    fts.eliminar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # Índice FTS5 de productos (ver inventario/fts.py); solo SQLite
+
+    dependencies = [
+        ('inventario', '0004_producto_columnas_numericas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, eliminar),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0005_producto_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='prod_foto_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:28
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_referencias(apps, schema_editor):
+    # Las fotos subidas antes del almacenamiento por contenido también se cuentan
+    Producto = apps.get_model('inventario', 'Producto')
+    ImagenProducto = apps.get_model('inventario', 'ImagenProducto')
+    filas = (
+        Producto.objects.exclude(prod_foto='').exclude(prod_foto__isnull=True)
+        .values('prod_foto').annotate(n=Count('prod_id'))
+    )
+    ImagenProducto.objects.bulk_create(
+        [ImagenProducto(ruta=f['prod_foto'], referencias=f['n']) for f in filas], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0006_producto_prod_foto_variantes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenProducto',
+            fields=[
+                ('ruta', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('referencias', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Imagen de producto',
+                'verbose_name_plural': 'Imágenes de producto',
+                'db_table': 'imagen_producto',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['prod_foto'], name='producto_foto_idx'),
+        ),
+        migrations.RunPython(contar_referencias, migrations.RunPython.noop),
+    ]
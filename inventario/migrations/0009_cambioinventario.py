@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:34
+
+from django.db import migrations, models
+
+
+def registrar_existentes(apps, schema_editor):
+    # Con ?since=0 el feed devuelve todo: se parte con una entrada por fila
+    CambioInventario = apps.get_model('inventario', 'CambioInventario')
+    for modelo, nombre in (
+        ('TipoCategoria', 'tipo_categoria'),
+        ('Marca', 'marca'),
+        ('Prestamo', 'prestamo'),
+        ('Producto', 'producto'),
+    ):
+        ids = apps.get_model('inventario', modelo).objects.values_list('pk', flat=True).iterator()
+        lote = []
+        for pk in ids:
+            lote.append(CambioInventario(modelo=nombre, objeto_id=pk))
+            if len(lote) >= 1000:
+                CambioInventario.objects.bulk_create(lote)
+                lote = []
+        CambioInventario.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0008_producto_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioInventario',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('modelo', models.CharField(max_length=20)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('borrado', models.BooleanField(default=False)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio de inventario',
+                'verbose_name_plural': 'Cambios de inventario',
+                'db_table': 'cambio_inventario',
+                'indexes': [models.Index(fields=['modelo', 'objeto_id'], name='cambio_objeto_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,25 @@
-from django.db import models
+from django.db import models, transaction
 import os
 import uuid
 
+from . import fotos
 
-class TipoCategoria(models.Model):
+
+class ConFeed(models.Model):
+    """
+    Guarda dentro de una transacción, para que la entrada del feed de
+    sincronización (``post_save`` en signals.py) se confirme con el cambio.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class TipoCategoria(ConFeed):
     tipr_id = models.AutoField(primary_key=True)
     tipr_nombre = models.CharField(max_length=45)
 
@@ -16,7 +32,7 @@ class TipoCategoria(models.Model):
         return self.tipr_nombre
 
 
-class Marca(models.Model):
+class Marca(ConFeed):
     marca_id = models.AutoField(primary_key=True)
     marca_nombre = models.CharField(max_length=45)
 
@@ -29,7 +45,7 @@ class Marca(models.Model):
         return self.marca_nombre
 
 
-class Prestamo(models.Model):
+class Prestamo(ConFeed):
     pres_id = models.AutoField(primary_key=True, db_column="pres_ID")
     pres_nombre = models.CharField(max_length=45)
     tipo_prestamo = models.CharField(max_length=45)
@@ -45,13 +61,15 @@ class Prestamo(models.Model):
 
     
 def producto_foto_upload_to(instance, filename):
-    # carpeta por producto y nombre único, preservando extensión
+    # carpeta por producto y nombre único, preservando extensión.
+    # Solo lo usan las migraciones viejas: Producto.save guarda las fotos nuevas
+    # por contenido (ver fotos.py).
     ext = filename.split('.')[-1].lower()
     filename = f"{uuid.uuid4()}.{ext}"
     return os.path.join("productos", str(instance.prod_id or "tmp"), filename)
 
 
-class Producto(models.Model):
+class Producto(ConFeed):
     prod_id = models.AutoField(primary_key=True)
     prod_nombre = models.CharField(max_length=45)
     prod_modelo = models.CharField(max_length=45, blank=True, null=True)
@@ -60,12 +78,19 @@ class Producto(models.Model):
         blank=True,
         null=True
     )
-    prod_valor_unitario = models.CharField(max_length=45)
+    # Miniaturas WebP de prod_foto, las genera inventario/imagenes.py en segundo plano:
+    # {"origen": <prod_foto.name>, "thumb": <ruta>, "md": <ruta>}
+    prod_foto_variantes = models.JSONField(default=dict, blank=True, editable=False)
+    prod_valor_unitario = models.DecimalField(max_digits=12, decimal_places=2)
     tipo_prestamos = models.CharField(max_length=45, blank=True, null=True)
     prod_estado = models.CharField(max_length=45, blank=True, null=True)
-    prod_cantidad_disponible = models.CharField(max_length=45, blank=True, null=True)
-    prod_cantidad_prestada = models.CharField(max_length=45, blank=True, null=True)
-    prod_cantidad_total = models.CharField(max_length=45, blank=True, null=True)
+    # Siempre disponible + prestada = total (ver constraints)
+    prod_cantidad_disponible = models.PositiveIntegerField(default=0)
+    prod_cantidad_prestada = models.PositiveIntegerField(default=0)
+    prod_cantidad_total = models.PositiveIntegerField(default=0)
+    # Última modificación; los QuerySet.update (stock.py, imagenes.py) lo ponen a mano.
+    # Con el MAX de esta columna se arma el ETag del listado (ver views.py)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
 
     # Relaciones
     tipo_categoria = models.ForeignKey(
@@ -91,6 +116,120 @@ class Producto(models.Model):
         db_table = "productos"
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
+        indexes = [
+            # Filtros por rango (?prod_valor_unitario__gte=, ?disponible__gt=) y ordenamiento
+            models.Index(fields=['prod_valor_unitario'], name='producto_valor_idx'),
+            models.Index(fields=['prod_cantidad_disponible'], name='producto_disponible_idx'),
+            # Productos que comparten una foto (variantes, conteo de referencias)
+            models.Index(fields=['prod_foto'], name='producto_foto_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(prod_valor_unitario__gte=0),
+                name='producto_valor_no_negativo',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(
+                    prod_cantidad_total=models.F('prod_cantidad_disponible') + models.F('prod_cantidad_prestada')
+                ),
+                name='producto_cantidades_cuadran',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.prod_nombre} ({self.prod_modelo})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ruta de la foto tal como se leyó, para que save() sepa si cambió
+        instance._foto_leida = instance.__dict__.get('prod_foto') or ''
+        return instance
+
+    def _foto_cambiada(self):
+        if self._state.adding or not hasattr(self, '_foto_leida'):
+            return True
+        foto = self.prod_foto
+        if foto and not foto._committed:
+            return True
+        return (foto.name or '') != self._foto_leida
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'actualizado_en' not in update_fields:
+            kwargs['update_fields'] = update_fields = [*update_fields, 'actualizado_en']
+        if update_fields is not None and 'prod_foto' not in update_fields:
+            super().save(*args, **kwargs)
+            return
+        diferidos = self.get_deferred_fields()
+        if 'prod_foto' in diferidos or not self._foto_cambiada():
+            # La foto no cambió: sin bloqueo ni cambios en las referencias. Tampoco
+            # se escribe, por si otra petición la cambió después de leer la fila
+            if update_fields is None:
+                kwargs['update_fields'] = [
+                    f.name for f in self._meta.concrete_fields
+                    if not f.primary_key and f.attname not in diferidos
+                    and f.name not in ('prod_foto', 'prod_foto_variantes')
+                ]
+            super().save(*args, **kwargs)
+            return
+
+        # La foto se guarda por contenido y con conteo de referencias (fotos.py)
+        with transaction.atomic(using=kwargs.get('using')):
+            anterior = ''
+            if not self._state.adding:
+                anterior = (
+                    Producto.objects.select_for_update()
+                    .filter(pk=self.pk).values_list('prod_foto', flat=True).first()
+                ) or ''
+
+            foto = self.prod_foto
+            sumada = None
+            if foto and not foto._committed:
+                foto.name = fotos.guardar(foto.file, foto.name)
+                foto._committed = True
+                sumada = foto.name
+            elif foto and foto.name != anterior:
+                fotos.sumar_referencia(foto.name)
+                sumada = foto.name
+
+            super().save(*args, **kwargs)
+
+            # Se reemplazó (aunque sea por la misma imagen) o se quitó la foto
+            if anterior and (sumada or not foto):
+                fotos.quitar_referencia(anterior)
+        self._foto_leida = foto.name or ''
+
+
+class ImagenProducto(models.Model):
+    """Cuántos productos usan cada archivo de foto (ver fotos.py)."""
+    ruta = models.CharField(max_length=255, primary_key=True)
+    referencias = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "imagen_producto"
+        verbose_name = "Imagen de producto"
+        verbose_name_plural = "Imágenes de producto"
+
+    def __str__(self):
+        return f"{self.ruta} ({self.referencias})"
+
+
+class CambioInventario(models.Model):
+    """Último cambio de cada fila, para el feed de sincronización (ver sincronizacion.py)."""
+    id = models.BigAutoField(primary_key=True)  # cursor del feed
+    modelo = models.CharField(max_length=20)
+    objeto_id = models.PositiveIntegerField()
+    borrado = models.BooleanField(default=False)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "cambio_inventario"
+        verbose_name = "Cambio de inventario"
+        verbose_name_plural = "Cambios de inventario"
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id'], name='cambio_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.modelo}:{self.objeto_id}{' (borrado)' if self.borrado else ''}"
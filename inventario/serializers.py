@@ -1,77 +1,63 @@
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
 
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
+from serializer.mixins import CamposDinamicosMixin
+
+from . import imagenes
+from .catalogos import CatalogoField
 from .models import TipoCategoria, Marca, Prestamo, Producto
 
 
 # ---- Serializers base para catálogos ----
 
-class TipoCategoriaSerializer(serializers.ModelSerializer):
+class TipoCategoriaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoCategoria
         fields = ["tipr_id", "tipr_nombre"]
 
 
-class MarcaSerializer(serializers.ModelSerializer):
+class MarcaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Marca
         fields = ["marca_id", "marca_nombre"]
 
 
-class PrestamoSerializer(serializers.ModelSerializer):
+class PrestamoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Prestamo
         fields = ["pres_id", "pres_nombre", "tipo_prestamo"]
 
 
-# ---- Helpers internos ----
-
-def _to_int(value, field_name):
-    """
-    Convierte cualquier entrada a entero >= 0.
-    Si viene vacío/None, lo trata como 0.
-    Lanza ValidationError si no es convertible o es negativo.
-    """
-    if value in (None, "", " "):
-        return 0
-    try:
-        ivalue = int(str(value).strip())
-    except (ValueError, TypeError):
-        raise serializers.ValidationError({field_name: "Debe ser un entero válido."})
-    if ivalue < 0:
-        raise serializers.ValidationError({field_name: "No puede ser negativo."})
-    return ivalue
-
-
-def _to_decimal_str(value, field_name):
-    """
-    Convierte a Decimal (>=0) y devuelve string normalizado, ya que tu modelo
-    almacena prod_valor_unitario como CharField.
-    """
-    if value in (None, "", " "):
-        raise serializers.ValidationError({field_name: "Es obligatorio."})
-    try:
-        d = Decimal(str(value).replace(",", "."))
-    except (InvalidOperation, ValueError):
-        raise serializers.ValidationError({field_name: "Debe ser numérico."})
-    if d < 0:
-        raise serializers.ValidationError({field_name: "No puede ser negativo."})
-    # normalizamos a string (sin notación científica)
-    return format(d, "f")
+# ---- Campos ----
+
+class ValorUnitarioField(serializers.DecimalField):
+    """Decimal >= 0 con 2 decimales; acepta coma como separador decimal."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_digits", 12)
+        kwargs.setdefault("decimal_places", 2)
+        kwargs.setdefault("min_value", Decimal("0"))
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = data.strip().replace(",", ".")
+        return super().to_internal_value(data)
 
 
 # ---- Serializer de Producto con dropdowns ----
 
-class ProductoSerializer(serializers.ModelSerializer):
-    # Dropdowns (DRF enviará los IDs seleccionados)
-    tipo_categoria = serializers.PrimaryKeyRelatedField(
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # Dropdowns (DRF enviará los IDs seleccionados); se validan contra catalogos.py
+    tipo_categoria = CatalogoField(
         queryset=TipoCategoria.objects.all().order_by("tipr_nombre")
     )
-    marca = serializers.PrimaryKeyRelatedField(
+    marca = CatalogoField(
         queryset=Marca.objects.all().order_by("marca_nombre")
     )
-    prestamo = serializers.PrimaryKeyRelatedField(
+    prestamo = CatalogoField(
         queryset=Prestamo.objects.all().order_by("pres_nombre")
     )
 
@@ -82,10 +68,13 @@ class ProductoSerializer(serializers.ModelSerializer):
 
     # Otros campos
     prod_foto = serializers.ImageField(required=False, allow_null=True)
+    # Miniaturas WebP (inventario/imagenes.py); mientras se generan se usa el original
+    prod_foto_thumb = serializers.SerializerMethodField(read_only=True)
+    prod_foto_variants = serializers.SerializerMethodField(read_only=True)
     prod_cantidad_disponible = serializers.IntegerField(required=False, min_value=0)
     prod_cantidad_prestada = serializers.IntegerField(required=False, min_value=0)
     prod_cantidad_total = serializers.IntegerField(required=False, min_value=0)
-    prod_valor_unitario = serializers.CharField()
+    prod_valor_unitario = ValorUnitarioField()
 
     class Meta:
         model = Producto
@@ -94,17 +83,28 @@ class ProductoSerializer(serializers.ModelSerializer):
             "prod_nombre",
             "prod_modelo",
             "prod_foto",
+            "prod_foto_thumb",
+            "prod_foto_variants",
             "prod_valor_unitario",
             "tipo_prestamos",
             "prod_estado",
             "prod_cantidad_disponible",
             "prod_cantidad_prestada",
             "prod_cantidad_total",
+            "actualizado_en",
             # FK por dropdown:
             "tipo_categoria", "marca", "prestamo",
             # nombres solo-lectura (para listar bonito):
             "tipo_categoria_nombre", "marca_nombre", "prestamo_nombre",
         ]
+        # Qué lee cada SerializerMethodField (para ?fields=, ver serializer/mixins.py)
+        dependencias = {
+            "tipo_categoria_nombre": ("tipo_categoria",),
+            "marca_nombre": ("marca",),
+            "prestamo_nombre": ("prestamo",),
+            "prod_foto_thumb": ("prod_foto", "prod_foto_variantes"),
+            "prod_foto_variants": ("prod_foto", "prod_foto_variantes"),
+        }
 
     # ---- getters de nombres ----
     def get_tipo_categoria_nombre(self, obj):
@@ -116,32 +116,40 @@ class ProductoSerializer(serializers.ModelSerializer):
     def get_prestamo_nombre(self, obj):
         return obj.prestamo.pres_nombre if obj.prestamo else None
 
+    # ---- fotos ----
+    def _url(self, ruta):
+        url = default_storage.url(ruta)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def _variantes(self, obj):
+        if not obj.prod_foto or imagenes.pendiente(obj):
+            return {}
+        return {nombre: obj.prod_foto_variantes[nombre] for nombre in imagenes.TAMANOS if nombre in obj.prod_foto_variantes}
+
+    def get_prod_foto_thumb(self, obj):
+        if not obj.prod_foto:
+            return None
+        ruta = self._variantes(obj).get("thumb", obj.prod_foto.name)
+        return self._url(ruta)
+
+    def get_prod_foto_variants(self, obj):
+        return {nombre: self._url(ruta) for nombre, ruta in self._variantes(obj).items()}
+
     # -------- Validación de reglas de inventario --------
     def validate(self, attrs):
-        # Normalizar valor unitario
-        if "prod_valor_unitario" in attrs:
-            attrs["prod_valor_unitario"] = _to_decimal_str(
-                attrs["prod_valor_unitario"], "prod_valor_unitario"
-            )
-
         # Asegurar consistencia de cantidades
-        disp = _to_int(
-            attrs.get("prod_cantidad_disponible", self._current_int("prod_cantidad_disponible")),
-            "prod_cantidad_disponible",
-        )
-        pres = _to_int(
-            attrs.get("prod_cantidad_prestada", self._current_int("prod_cantidad_prestada")),
-            "prod_cantidad_prestada",
-        )
+        disp = attrs.get("prod_cantidad_disponible", self._actual("prod_cantidad_disponible"))
+        pres = attrs.get("prod_cantidad_prestada", self._actual("prod_cantidad_prestada"))
         total = attrs.get("prod_cantidad_total", None)
-        total = _to_int(total, "prod_cantidad_total") if total is not None else disp + pres
+        if total is None:
+            total = disp + pres
 
         if pres > total:
             raise serializers.ValidationError({"prod_cantidad_prestada": "No puede superar el total."})
         if disp + pres != total:
             total = disp + pres  # regla del sistema
 
-        # Guardar de regreso (enteros; luego convertimos a str para el modelo)
         attrs["prod_cantidad_disponible"] = disp
         attrs["prod_cantidad_prestada"] = pres
         attrs["prod_cantidad_total"] = total
@@ -158,27 +166,11 @@ class ProductoSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def _current_int(self, field_name):
-        """Obtiene el valor entero actual del instance (si existe)."""
+    def _actual(self, field_name):
+        """Valor actual del instance (0 al crear)."""
         if not getattr(self, "instance", None):
             return 0
-        raw = getattr(self.instance, field_name, "0") or "0"
-        return _to_int(raw, field_name)
-
-    # -------- create / update --------
-    # Dejamos que ModelSerializer maneje las FKs (por los dropdowns).
-    # Solo convertimos las cantidades a string porque el modelo las guarda en CharField.
-    def create(self, validated_data):
-        for f in ("prod_cantidad_disponible", "prod_cantidad_prestada", "prod_cantidad_total"):
-            if f in validated_data:
-                validated_data[f] = str(validated_data[f])
-        return Producto.objects.create(**validated_data)
-
-    def update(self, instance, validated_data):
-        for f in ("prod_cantidad_disponible", "prod_cantidad_prestada", "prod_cantidad_total"):
-            if f in validated_data:
-                validated_data[f] = str(validated_data[f])
-        return super().update(instance, validated_data)
+        return getattr(self.instance, field_name)
 
 
 # ---- Serializers para acciones de inventario ----
@@ -190,3 +182,14 @@ class OperacionStockSerializer(serializers.Serializer):
         if value <= 0:
             raise serializers.ValidationError("La cantidad debe ser mayor que 0.")
         return value
+
+
+class MovimientoSerializer(serializers.Serializer):
+    prod_id = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+    tipo = serializers.ChoiceField(choices=["prestar", "devolver"])
+
+
+class MovimientosSerializer(serializers.Serializer):
+    # Un solo UPDATE por lote: el tope acota el tamaño de la sentencia
+    movimientos = MovimientoSerializer(many=True, allow_empty=False, max_length=500)
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocompletar, catalogos, fotos, imagenes, sincronizacion
+from .models import Marca, Prestamo, Producto, TipoCategoria
+
+
+# Índice de autocompletar: se aplica al confirmar, para no mostrar filas que
+# terminen en rollback
+@receiver(post_save, sender=Producto)
+def autocompletar_guardado(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"prod_nombre", "prod_modelo"} & set(update_fields):
+        return
+    prod_id, nombre, modelo = instance.pk, instance.prod_nombre, instance.prod_modelo
+    transaction.on_commit(lambda: autocompletar.producto_guardado(prod_id, nombre, modelo))
+
+
+@receiver(post_delete, sender=Producto)
+def autocompletar_borrado(sender, instance, **kwargs):
+    prod_id = instance.pk
+    transaction.on_commit(lambda: autocompletar.producto_borrado(prod_id))
+
+
+# Variantes WebP de la foto: se encolan al confirmar, fuera del request
+@receiver(post_save, sender=Producto)
+def encolar_variantes_foto(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "prod_foto" not in update_fields:
+        return
+    if not imagenes.pendiente(instance):
+        return
+    prod_id, origen = instance.pk, instance.prod_foto.name
+    transaction.on_commit(lambda: imagenes.encolar(prod_id, origen))
+
+
+# La foto puede estar compartida: solo se borra cuando ya nadie la usa
+@receiver(post_delete, sender=Producto)
+def liberar_foto(sender, instance, **kwargs):
+    if instance.prod_foto:
+        fotos.quitar_referencia(instance.prod_foto.name)
+
+
+# Catálogos en memoria: se invalidan ya (este proceso no debe validar contra
+# filas borradas) y otra vez al confirmar, por si otro proceso recargó en medio
+@receiver(post_save, sender=TipoCategoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Prestamo)
+@receiver(post_delete, sender=TipoCategoria)
+@receiver(post_delete, sender=Marca)
+@receiver(post_delete, sender=Prestamo)
+def invalidar_catalogo(sender, **kwargs):
+    catalogos.invalidar(sender)
+    transaction.on_commit(lambda: catalogos.invalidar(sender))
+
+
+# Feed de sincronización (?since=): una entrada por fila cambiada o borrada
+@receiver(post_save, sender=TipoCategoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_save, sender=Prestamo)
+@receiver(post_save, sender=Producto)
+def registrar_cambio(sender, instance, **kwargs):
+    sincronizacion.registrar(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=TipoCategoria)
+@receiver(post_delete, sender=Marca)
+@receiver(post_delete, sender=Prestamo)
+@receiver(post_delete, sender=Producto)
+def registrar_borrado(sender, instance, **kwargs):
+    sincronizacion.registrar(sender, [instance.pk], borrado=True)
@@ -0,0 +1,92 @@
+"""
+Feed de cambios para clientes que sincronizan sin conexión (``?since=``).
+
+``CambioInventario`` guarda una sola entrada por fila de Producto, Marca,
+TipoCategoria o Prestamo: la de su último cambio. Cada vez que una fila cambia
+se borra su entrada anterior y se inserta otra, con un id nuevo (el cursor). Un
+borrado deja una entrada con ``borrado=True`` (tombstone). Así el cliente pide
+lo que tenga id mayor a su cursor y el costo depende de cuántas filas cambiaron,
+no del tamaño del catálogo.
+
+Las señales de ``signals.py`` registran los save/delete. Lo que no pasa por
+señales (``QuerySet.update`` en ``stock.py`` e ``imagenes.py``, ``bulk_create``)
+llama a ``registrar`` a mano.
+
+La entrada se escribe en la misma transacción que el cambio: se confirman o se
+pierden juntos. Por eso ``registrar`` se llama dentro del ``atomic`` del cambio;
+los modelos con feed guardan dentro de una transacción (``ConFeed`` en
+models.py) y ``delete()`` ya manda ``post_delete`` dentro de la suya.
+
+Se asume un solo escritor a la vez, como en SQLite: el id de una entrada se
+asigna al insertarla, y solo si las transacciones que escriben se confirman de a
+una los ids siguen el orden de confirmación. Con escritores concurrentes
+(PostgreSQL, MySQL) una transacción puede confirmar un id menor después de que un
+cliente leyó uno mayor, y ese cliente se saltaría la fila.
+"""
+from collections import defaultdict
+
+from django.db.models import F, Func, Subquery
+
+from .models import CambioInventario, Marca, Prestamo, Producto, TipoCategoria
+
+# Modelo -> nombre en la bitácora
+NOMBRES = {
+    TipoCategoria: "tipo_categoria",
+    Marca: "marca",
+    Prestamo: "prestamo",
+    Producto: "producto",
+}
+
+LIMITE = 500
+LIMITE_MAXIMO = 5000
+TROZO = 500
+
+
+def registrar(modelo, ids, borrado=False, nuevos=False):
+    """
+    Anota que cambiaron (o se borraron) ``ids``, en la transacción en curso. Con
+    ``nuevos=True`` (filas recién creadas) no se buscan entradas anteriores.
+    """
+    ids = list(ids)
+    nombre = NOMBRES[modelo]
+    for i in range(0, len(ids), TROZO):
+        trozo = ids[i:i + TROZO]
+        if not nuevos:
+            CambioInventario.objects.filter(modelo=nombre, objeto_id__in=trozo).delete()
+        CambioInventario.objects.bulk_create(
+            CambioInventario(modelo=nombre, objeto_id=pk, borrado=borrado) for pk in trozo
+        )
+
+
+
+def ultimo_cambio(*modelos):
+    """
+    Subconsulta con el id de la última entrada de ``modelos``: cambia con
+    cualquier save o delete. Se anota en otra consulta para no sumar un viaje.
+    """
+    return Subquery(
+        CambioInventario.objects.filter(modelo__in=[NOMBRES[m] for m in modelos])
+        .order_by()
+        .values(ultimo=Func(F("id"), function="MAX"))
+    )
+
+
+def pendientes(cursor, limite=LIMITE):
+    """
+    Cambios con id mayor a ``cursor``, en orden.
+
+    Devuelve ``(cursor_nuevo, hay_mas, vivos, borrados)``; ``vivos`` y
+    ``borrados`` son ``{nombre: [ids]}``.
+    """
+    filas = list(
+        CambioInventario.objects.filter(id__gt=cursor)
+        .order_by("id")
+        .values_list("id", "modelo", "objeto_id", "borrado")[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    vivos, borrados = defaultdict(list), defaultdict(list)
+    for _, nombre, objeto_id, borrado in filas:
+        (borrados if borrado else vivos)[nombre].append(objeto_id)
+    return (filas[-1][0] if filas else cursor), hay_mas, vivos, borrados
@@ -0,0 +1,162 @@
+"""
+Movimientos de stock de Producto en un solo UPDATE condicional.
+
+``prestar`` y ``devolver`` no leen la fila antes de escribirla: la condición
+va en el WHERE (``disponible >= n`` / ``prestada >= n``) y las cantidades se
+actualizan con expresiones F, así que dos préstamos simultáneos de la última
+unidad no pueden salir bien los dos. Si el UPDATE no toca ninguna fila, el
+movimiento no procedía (o el producto no existe).
+
+El total no cambia: lo que sale de disponible entra en prestada.
+
+``aplicar_movimientos`` hace lo mismo para un lote (p. ej. un kit de varios
+productos): todo o nada, con un UPDATE y un SELECT sin importar el tamaño.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from . import sincronizacion
+from .models import Producto
+
+CONTADORES = (
+    "prod_id",
+    "prod_cantidad_disponible",
+    "prod_cantidad_prestada",
+    "prod_cantidad_total",
+    "prod_estado",
+)
+
+PRESTAR = "prestar"
+DEVOLVER = "devolver"
+
+# Estados que se reemplazan por "activo" cuando vuelve a haber stock
+_ESTADOS_SIN_STOCK = ("", " ", "agotado", "sin_stock")
+
+
+class MovimientosRechazados(Exception):
+    """El lote no se aplicó; ``errores`` dice qué producto lo impidió."""
+
+    def __init__(self, errores):
+        super().__init__(errores)
+        self.errores = errores
+
+
+def contadores(prod_id):
+    """Cantidades y estado actuales del producto, o None si no existe."""
+    return Producto.objects.filter(pk=prod_id).values(*CONTADORES).first()
+
+
+def prestar(prod_id, cantidad):
+    """Devuelve True si se prestaron ``cantidad`` unidades."""
+    with transaction.atomic():
+        filas = Producto.objects.filter(pk=prod_id, prod_cantidad_disponible__gte=cantidad).update(
+            # El estado va primero: MySQL evalúa el SET de izquierda a derecha
+            prod_estado=Case(
+                When(prod_cantidad_disponible=cantidad, then=Value("agotado")),
+                default=F("prod_estado"),
+            ),
+            prod_cantidad_disponible=F("prod_cantidad_disponible") - cantidad,
+            prod_cantidad_prestada=F("prod_cantidad_prestada") + cantidad,
+            actualizado_en=timezone.now(),
+        )
+        if filas:
+            sincronizacion.registrar(Producto, [prod_id])
+    return filas == 1
+
+
+def devolver(prod_id, cantidad):
+    """Devuelve True si se devolvieron ``cantidad`` unidades."""
+    with transaction.atomic():
+        filas = Producto.objects.filter(pk=prod_id, prod_cantidad_prestada__gte=cantidad).update(
+            prod_estado=Case(
+                When(Q(prod_estado__isnull=True) | Q(prod_estado__in=_ESTADOS_SIN_STOCK), then=Value("activo")),
+                default=F("prod_estado"),
+            ),
+            prod_cantidad_disponible=F("prod_cantidad_disponible") + cantidad,
+            prod_cantidad_prestada=F("prod_cantidad_prestada") - cantidad,
+            actualizado_en=timezone.now(),
+        )
+        if filas:
+            sincronizacion.registrar(Producto, [prod_id])
+    return filas == 1
+
+
+def _netos(movimientos):
+    """{prod_id: unidades que pasan de disponible a prestada (negativo = devolución)}."""
+    netos = {}
+    for prod_id, cantidad, tipo in movimientos:
+        netos[prod_id] = netos.get(prod_id, 0) + (cantidad if tipo == PRESTAR else -cantidad)
+    return netos
+
+
+def _actualizar_lote(cambios):
+    """Un solo UPDATE para todos los productos; devuelve cuántas filas cumplieron la condición."""
+    condicion = Q(pk__in=[])
+    deltas = []
+    estados = []
+    for prod_id, delta in cambios.items():
+        deltas.append(When(pk=prod_id, then=Value(delta)))
+        if delta > 0:
+            condicion |= Q(pk=prod_id, prod_cantidad_disponible__gte=delta)
+            estados.append(When(pk=prod_id, prod_cantidad_disponible=delta, then=Value("agotado")))
+        else:
+            condicion |= Q(pk=prod_id, prod_cantidad_prestada__gte=-delta)
+            estados.append(When(
+                Q(pk=prod_id) & (Q(prod_estado__isnull=True) | Q(prod_estado__in=_ESTADOS_SIN_STOCK)),
+                then=Value("activo"),
+            ))
+    delta = Case(*deltas, default=Value(0), output_field=IntegerField())
+    return Producto.objects.filter(condicion).update(
+        prod_estado=Case(*estados, default=F("prod_estado")),
+        prod_cantidad_disponible=F("prod_cantidad_disponible") - delta,
+        prod_cantidad_prestada=F("prod_cantidad_prestada") + delta,
+        actualizado_en=timezone.now(),
+    )
+
+
+def _leer_contadores(ids):
+    return {c["prod_id"]: c for c in Producto.objects.filter(pk__in=ids).values(*CONTADORES)}
+
+
+def aplicar_movimientos(movimientos):
+    """
+    Aplica ``[(prod_id, cantidad, tipo), ...]`` todo o nada.
+
+    Los movimientos de un mismo producto se suman antes de escribir. Devuelve
+    los contadores finales de cada producto, o lanza ``MovimientosRechazados``
+    sin haber cambiado nada.
+    """
+    netos = _netos(movimientos)
+    cambios = {prod_id: delta for prod_id, delta in netos.items() if delta}
+
+    with transaction.atomic():
+        filas = _actualizar_lote(cambios) if cambios else 0
+        if filas == len(cambios):
+            actuales = _leer_contadores(netos)
+            if len(actuales) == len(netos):
+                sincronizacion.registrar(Producto, cambios)
+                return [actuales[prod_id] for prod_id in netos]
+        transaction.set_rollback(True)
+
+    # Se deshizo el lote: los errores se calculan con los valores sin tocar
+    actuales = _leer_contadores(netos)
+    errores = []
+    for prod_id, delta in netos.items():
+        actual = actuales.get(prod_id)
+        if actual is None:
+            errores.append({"prod_id": prod_id, "detail": "No existe."})
+        elif delta > actual["prod_cantidad_disponible"]:
+            errores.append({
+                "prod_id": prod_id,
+                "detail": f"No hay suficiente stock. Disponible: {actual['prod_cantidad_disponible']}.",
+            })
+        elif -delta > actual["prod_cantidad_prestada"]:
+            errores.append({
+                "prod_id": prod_id,
+                "detail": f"No puedes devolver más de lo prestado. Prestado: {actual['prod_cantidad_prestada']}.",
+            })
+    if not errores:
+        # Otra petición movió el stock entre el UPDATE y esta lectura
+        errores.append({"prod_id": None, "detail": "El stock cambió durante la operación, intenta de nuevo."})
+    raise MovimientosRechazados(errores)
@@ -1,3 +1,532 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.commands.migrate import Command as MigrateCommand
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.autenticacion.cache import CacheLRU
+from apps.autenticacion.checks import cache_compartida
+from inventario import autocompletar, catalogos, fts, imagenes, importacion, sincronizacion, stock
+from inventario.checks import triggers_fts
+from inventario.views import ProductoViewSet
+from inventario.models import CambioInventario, ImagenProducto, Marca, Prestamo, Producto, TipoCategoria
+
+
+def crear_catalogos():
+    return (
+        TipoCategoria.objects.create(tipr_nombre='Herramientas'),
+        Marca.objects.create(marca_nombre='Acme'),
+        Prestamo.objects.create(pres_nombre='Diario', tipo_prestamo='corto'),
+    )
+
+
+def crear_producto(tipo, marca, prestamo, nombre='Taladro', disponible=2):
+    return Producto.objects.create(
+        prod_nombre=nombre, prod_valor_unitario=10, tipo_categoria=tipo, marca=marca, prestamo=prestamo,
+        prod_cantidad_disponible=disponible, prod_cantidad_total=disponible,
+    )
+
+
+class FeedCambiosTests(TestCase):
+    url = '/api/inventario/api/cambios/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.tipo, self.marca, self.prestamo = crear_catalogos()
+
+    def test_cambios_y_borrados_desde_el_cursor(self):
+        a = crear_producto(self.tipo, self.marca, self.prestamo, 'a')
+        b = crear_producto(self.tipo, self.marca, self.prestamo, 'b')
+        datos = self.client.get(self.url + '?since=0').data
+        self.assertEqual([p['prod_id'] for p in datos['productos']], [a.pk, b.pk])
+        self.assertEqual(len(datos['marcas']), 1)
+
+        cursor = datos['cursor']
+        stock.prestar(a.pk, 1)
+        b_id = b.pk
+        b.delete()
+        datos = self.client.get(self.url + f'?since={cursor}').data
+        self.assertEqual([p['prod_id'] for p in datos['productos']], [a.pk])
+        self.assertEqual(datos['productos'][0]['prod_cantidad_prestada'], 1)
+        self.assertEqual(datos['borrados']['productos'], [b_id])
+        # Una sola entrada por fila
+        self.assertEqual(CambioInventario.objects.filter(modelo='producto').count(), 2)
+
+    def test_el_registro_se_deshace_con_el_cambio(self):
+        cursor = self.client.get(self.url + '?since=0').data['cursor']
+        with transaction.atomic():
+            crear_producto(self.tipo, self.marca, self.prestamo)
+            transaction.set_rollback(True)
+        self.assertEqual(self.client.get(self.url + f'?since={cursor}').data['productos'], [])
+
+    def test_catalogo_nuevo_aunque_la_copia_en_memoria_este_vieja(self):
+        catalogos.obtener(Marca)
+        cursor = self.client.get(self.url + '?since=0').data['cursor']
+        # Otro proceso crea la marca: la copia en memoria de este aún no se entera
+        with transaction.atomic():
+            nueva = Marca(marca_nombre='Nueva')
+            Marca.objects.bulk_create([nueva])
+            sincronizacion.registrar(Marca, [nueva.pk], nuevos=True)
+
+        datos = self.client.get(self.url + f'?since={cursor}').data
+        self.assertEqual([m['marca_id'] for m in datos['marcas']], [nueva.pk])
+
+
+class PaginacionKeysetTests(TestCase):
+    url = '/api/inventario/api/productos/'
+
+    def setUp(self):
+        catalogo = crear_catalogos()
+        for i in range(30):
+            # Nombres y valores repetidos: el desempate por pk tiene que funcionar
+            producto = crear_producto(*catalogo, nombre=f'p{i % 7}')
+            Producto.objects.filter(pk=producto.pk).update(prod_valor_unitario=i % 5)
+
+    def recorrer(self, url):
+        vistos, paginas = [], []
+        while url:
+            datos = self.client.get(url).data
+            paginas.append(datos)
+            vistos += [p['prod_id'] for p in datos['results']]
+            url = datos['next']
+        return vistos, paginas
+
+    def test_recorre_todo_sin_repetir(self):
+        for orden in ('', '&ordering=-prod_valor_unitario'):
+            vistos, paginas = self.recorrer(f'{self.url}?page_size=7{orden}')
+            self.assertEqual(len(paginas), 5)
+            self.assertEqual(len(vistos), len(set(vistos)))
+            self.assertCountEqual(vistos, Producto.objects.values_list('pk', flat=True))
+
+    def test_pagina_anterior(self):
+        _, paginas = self.recorrer(f'{self.url}?page_size=7')
+        anterior = self.client.get(paginas[2]['previous']).data
+        self.assertEqual(anterior['results'], paginas[1]['results'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get(f'{self.url}?cursor=basura').status_code, 404)
+
+    def test_paginacion_por_defecto(self):
+        self.assertIn('results', self.client.get('/api/inventario/api/marcas/').data)
+        self.assertIn('results', self.client.get('/api/renta/pagos/').data)
+
+
+@skipUnlessDBFeature('can_rollback_ddl')
+class BusquedaFTSTests(TestCase):
+    url = '/api/inventario/api/productos/'
+
+    def setUp(self):
+        if not fts.disponible(connection):
+            self.skipTest('SQLite sin FTS5')
+        self.tipo, self.marca, self.prestamo = crear_catalogos()
+        self.taladro = crear_producto(self.tipo, self.marca, self.prestamo, 'Taladro percutor')
+        self.sierra = crear_producto(self.tipo, self.marca, self.prestamo, 'Sierra circular')
+
+    def buscar(self, texto):
+        return [p['prod_id'] for p in self.client.get(self.url, {'search': texto}).data['results']]
+
+    def test_prefijos_y_acentos(self):
+        self.assertEqual(self.buscar('percu tala'), [self.taladro.pk])
+        self.assertEqual(self.buscar('CIRCULAR'), [self.sierra.pk])
+        self.assertEqual(self.buscar('"acme'), [self.taladro.pk, self.sierra.pk])
+
+    def test_relevancia_paginada_con_un_solo_match(self):
+        for i in range(5):
+            crear_producto(self.tipo, self.marca, self.prestamo, 'taladro ' * (i % 3 + 1) + f'x{i}')
+        vistos, url, params = [], self.url, {'search': 'taladro', 'page_size': 2}
+        with CaptureQueriesContext(connection) as capturadas:
+            while url:
+                datos = self.client.get(url, params).data
+                vistos += [p['prod_nombre'] for p in datos['results']]
+                url, params = datos['next'], None
+        # Más repeticiones del término = más relevante; empates por pk
+        self.assertEqual(vistos, [
+            'taladro taladro taladro x2', 'taladro taladro x1', 'taladro taladro x4',
+            'Taladro percutor', 'taladro x0', 'taladro x3',
+        ])
+        for consulta in capturadas.captured_queries:
+            self.assertLessEqual(consulta['sql'].count('MATCH'), 1, consulta['sql'])
+
+    def test_triggers_siguen_a_productos_y_catalogos(self):
+        Producto.objects.filter(pk=self.sierra.pk).update(prod_nombre='Serrucho')
+        self.marca.marca_nombre = 'Bosch'
+        self.marca.save()
+        self.assertEqual(self.buscar('serrucho bosch'), [self.sierra.pk])
+        self.assertEqual(self.buscar('acme'), [])
+
+    def test_migracion_fallida_restaura_los_triggers(self):
+        def falla(*args, **kwargs):
+            fts.quitar_triggers(connection)  # lo que hizo pre_migrate
+            Producto.objects.filter(pk=self.sierra.pk).update(prod_nombre='Serrucho')
+            raise RuntimeError('migración rota')
+
+        with mock.patch.object(MigrateCommand, 'handle', side_effect=falla):
+            with self.assertRaises(RuntimeError):
+                call_command('migrate', verbosity=0)
+        self.assertEqual(fts.triggers_faltantes(connection), [])
+        # El índice se reconstruyó con lo que cambió mientras no había triggers
+        self.assertEqual(self.buscar('serrucho'), [self.sierra.pk])
+
+    def test_check_avisa_si_faltan_triggers(self):
+        self.assertEqual(triggers_fts(None, databases=['default']), [])
+        fts.quitar_triggers(connection)
+        self.assertEqual([w.id for w in triggers_fts(None, databases=['default'])], ['inventario.W001'])
+
+
+class ListadoCondicionalTests(TestCase):
+    url = '/api/inventario/api/productos/'
+
+    def setUp(self):
+        self.tipo, self.marca, self.prestamo = crear_catalogos()
+        self.producto = crear_producto(self.tipo, self.marca, self.prestamo)
+
+    def get(self, etag=None, **params):
+        cabeceras = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, params, **cabeceras)
+
+    def test_filtra_una_sola_vez(self):
+        with mock.patch.object(
+            ProductoViewSet, 'filter_queryset', autospec=True, side_effect=ProductoViewSet.filter_queryset,
+        ) as filtrar:
+            respuesta = self.get(search='taladro', ordering='prod_nombre')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data['results']), 1)
+        self.assertEqual(filtrar.call_count, 1)
+
+    def test_304_hasta_que_cambia_algo(self):
+        etag = self.get()['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(etag).status_code, 304)
+
+        stock.prestar(self.producto.pk, 1)
+        respuesta = self.get(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta['ETag']
+
+        self.marca.marca_nombre = 'Otra'
+        self.marca.save()
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_catalogo_cambiado_en_otro_proceso(self):
+        etag = self.get()['ETag']
+        detalle = self.client.get(f'{self.url}{self.producto.pk}/')
+        # Lo que deja en la base un save hecho en otro worker: la versión de
+        # catalogos.py de este proceso no cambia
+        with transaction.atomic():
+            Marca.objects.filter(pk=self.marca.pk).update(marca_nombre='Otra')
+            sincronizacion.registrar(Marca, [self.marca.pk])
+
+        respuesta = self.get(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['results'][0]['marca_nombre'], 'Otra')
+        respuesta = self.client.get(f'{self.url}{self.producto.pk}/', HTTP_IF_NONE_MATCH=detalle['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_etag_depende_de_los_filtros(self):
+        self.assertNotEqual(self.get()['ETag'], self.get(search='sierra')['ETag'])
+
+
+class CatalogosEntreProcesosTests(TestCase):
+    """Cada ``proceso`` tiene su LocMemCache y su copia de los catálogos, como dos workers sin Redis."""
+
+    def setUp(self):
+        self.locales = {}
+
+    @contextmanager
+    def proceso(self, nombre):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'{self.id()}-{nombre}',
+        }}
+        locales = self.locales.setdefault(nombre, CacheLRU(16, ttl=1))
+        with override_settings(CACHES=caches, CATALOGOS_CACHE_TIMEOUT=1), \
+                mock.patch.object(catalogos, '_locales', locales):
+            yield
+
+    def test_marca_de_otro_proceso_se_ve_al_vencer(self):
+        with self.proceso('a'):
+            self.assertEqual(catalogos.obtener(Marca).por_id, {})
+            version = catalogos.version(Marca)
+        with self.proceso('b'):
+            nueva = Marca.objects.create(marca_nombre='Nueva')
+
+        with self.proceso('a'):
+            self.assertNotIn(nueva.pk, catalogos.obtener(Marca).por_id)
+            self.assertEqual(catalogos.version(Marca), version)
+
+        time.sleep(1.1)
+        with self.proceso('a'):
+            self.assertIn(nueva.pk, catalogos.obtener(Marca).por_id)
+            self.assertNotEqual(catalogos.version(Marca), version)
+
+    def test_check_avisa_por_los_catalogos(self):
+        self.assertIn('CATALOGOS_CACHE_TIMEOUT', cache_compartida(None)[0].hint)
+
+
+class AutocompletarEntreProcesosTests(TestCase):
+    """Cada ``proceso`` tiene su LocMemCache y su índice, como dos workers sin Redis."""
+
+    def setUp(self):
+        self.catalogo = crear_catalogos()
+        self.estados = {}
+
+    @contextmanager
+    def proceso(self, nombre):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'{self.id()}-{nombre}',
+        }}
+        estado = self.estados.setdefault(nombre, {
+            '_indice': autocompletar.IndicePrefijos(), '_version_local': None, '_cargado_en': None,
+        })
+        with override_settings(CACHES=caches, AUTOCOMPLETAR_CACHE_TIMEOUT=1), \
+                mock.patch.multiple(autocompletar, **estado):
+            try:
+                yield
+            finally:
+                estado.update({clave: getattr(autocompletar, clave) for clave in estado})
+
+    def buscar(self, prefijo):
+        return [p['label'] for p in autocompletar.indice().buscar(prefijo)]
+
+    def crear(self, nombre):
+        with self.captureOnCommitCallbacks(execute=True):
+            return crear_producto(*self.catalogo, nombre=nombre)
+
+    def test_producto_de_otro_proceso_se_ve_al_vencer(self):
+        with self.proceso('a'):
+            self.assertEqual(self.buscar('tal'), [])
+        with self.proceso('b'):
+            self.crear('Taladro')
+
+        with self.proceso('a'):
+            self.assertEqual(self.buscar('tal'), [])
+        time.sleep(0.6)
+        with self.proceso('a'):
+            # Un cambio propio renueva la clave, pero no la edad del índice
+            self.crear('Sierra')
+            self.assertEqual(self.buscar('tal'), [])
+        time.sleep(0.6)
+        with self.proceso('a'):
+            self.assertEqual(self.buscar('tal'), ['Taladro'])
+            self.assertEqual(self.buscar('sie'), ['Sierra'])
+
+
+class ImportacionProductosTests(TestCase):
+    CABECERA = 'prod_nombre,marca,tipo_categoria,prestamo,prod_valor_unitario,prod_cantidad_total\n'
+
+    def csv(self, filas, extra=b''):
+        texto = self.CABECERA + ''.join(filas)
+        return io.BytesIO(texto.encode() + extra)
+
+    def importar(self, archivo, lote=1000):
+        importador = importacion.ImportadorProductos(lote=lote)
+        return importador, importador.importar(importacion.filas(archivo, 'productos.csv'))
+
+    def test_crea_productos_y_catalogos(self):
+        _, resumen = self.importar(self.csv([
+            'Taladro,Acme,Herramientas,Diario,10.5,3\n',
+            'Sierra,acme ,Herramientas,Diario,"7,25",0\n',
+            ',Acme,Herramientas,Diario,1,1\n',
+        ]))
+        self.assertEqual((resumen['creados'], resumen['con_errores']), (2, 1))
+        self.assertEqual(resumen['errores'][0]['fila'], 4)
+        self.assertEqual(Marca.objects.count(), 1)
+        sierra = Producto.objects.get(prod_nombre='Sierra')
+        self.assertEqual(sierra.prod_estado, 'sin_stock')
+        self.assertEqual(str(sierra.prod_valor_unitario), '7.25')
+
+    def test_no_duplica_catalogos_que_no_estan_en_memoria(self):
+        catalogos.obtener(Marca)
+        # Creada por otro proceso: la copia en memoria de este aún no la tiene
+        Marca.objects.bulk_create([Marca(marca_nombre='Acme')])
+        self.importar(self.csv(['Taladro,ACME,Herramientas,Diario,1,1\n']))
+        self.assertEqual(Marca.objects.count(), 1)
+
+    def test_archivo_ilegible_conserva_lotes_confirmados(self):
+        filas = [f'P{i},Acme,Herramientas,Diario,1,1\n' for i in range(400)]  # más que el búfer de lectura
+        importador = importacion.ImportadorProductos(lote=50)
+        with self.assertRaises(importacion.ArchivoIlegible):
+            importador.importar(importacion.filas(self.csv(filas, b'\xff\xfe,x\n'), 'productos.csv'))
+        self.assertGreater(importador.creados, 0)
+        self.assertEqual(Producto.objects.count(), importador.creados)
+
+    def test_errores_de_lectura_son_400(self):
+        url = '/api/inventario/api/productos/importar/'
+        casos = [
+            ('productos.csv', self.CABECERA.encode() + b'\xff\xfe\n'),
+            ('productos.csv', self.CABECERA.encode() + b'x' * (csv.field_size_limit() + 1) + b'\n'),
+            ('productos.xlsx', b'esto no es un zip'),
+        ]
+        for nombre, contenido in casos:
+            with self.subTest(nombre=nombre):
+                respuesta = self.client.post(url, {'archivo': SimpleUploadedFile(nombre, contenido)})
+                self.assertEqual(respuesta.status_code, 400, respuesta.data)
+                self.assertIn('archivo', respuesta.data)
+
+    def test_exportar_csv_y_ndjson_gzip(self):
+        self.importar(self.csv(['Taladro,Acme,Herramientas,Diario,10,2\n']))
+        respuesta = self.client.get('/api/inventario/api/productos/exportar/')
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(lineas[0].split(',')[:2], ['prod_id', 'prod_nombre'])
+        self.assertIn('Taladro', lineas[1])
+
+        respuesta = self.client.get('/api/inventario/api/productos/exportar/', {'formato': 'ndjson', 'gzip': '1'})
+        fila = json.loads(gzip.decompress(b''.join(respuesta.streaming_content)))
+        self.assertEqual((fila['prod_nombre'], fila['marca']), ('Taladro', 'Acme'))
+
+
+def png(color=(255, 0, 0)):
+    contenido = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(contenido, 'PNG')
+    return SimpleUploadedFile('foto.png', contenido.getvalue(), 'image/png')
+
+
+class FotosProductoTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        patcher = mock.patch.object(imagenes, '_executor', None)  # variantes en el mismo hilo
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.catalogo = crear_catalogos()
+
+    def con_foto(self, foto):
+        producto = Producto(
+            prod_nombre='Taladro', prod_valor_unitario=10, prod_foto=foto,
+            tipo_categoria=self.catalogo[0], marca=self.catalogo[1], prestamo=self.catalogo[2],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        return Producto.objects.get(pk=producto.pk)
+
+    def test_misma_foto_se_guarda_una_vez(self):
+        a, b = self.con_foto(png()), self.con_foto(png())
+        self.assertEqual(a.prod_foto.name, b.prod_foto.name)
+        self.assertEqual(ImagenProducto.objects.get(ruta=a.prod_foto.name).referencias, 2)
+
+        b.prod_foto = png((0, 0, 255))
+        with self.captureOnCommitCallbacks(execute=True):
+            b.save()
+        self.assertEqual(ImagenProducto.objects.get(ruta=a.prod_foto.name).referencias, 1)
+        self.assertEqual(ImagenProducto.objects.get(ruta=b.prod_foto.name).referencias, 1)
+
+    def test_guardar_sin_cambiar_la_foto_no_la_relee(self):
+        producto = self.con_foto(png())
+        producto.prod_nombre = 'Taladro inalámbrico'
+        with CaptureQueriesContext(connection) as consultas:
+            producto.save()
+        self.assertFalse(any(
+            q['sql'].startswith('SELECT') and '"productos"' in q['sql'] for q in consultas.captured_queries
+        ))
+        self.assertEqual(ImagenProducto.objects.get(ruta=producto.prod_foto.name).referencias, 1)
+
+    def test_no_pisa_una_foto_cambiada_por_otro(self):
+        producto = self.con_foto(png())
+        otra_copia = Producto.objects.get(pk=producto.pk)
+        otra_copia.prod_foto = png((0, 255, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            otra_copia.save()
+
+        producto.prod_nombre = 'Taladro inalámbrico'
+        producto.save()
+        actual = Producto.objects.get(pk=producto.pk)
+        self.assertEqual(actual.prod_nombre, 'Taladro inalámbrico')
+        self.assertEqual(actual.prod_foto.name, otra_copia.prod_foto.name)
+        self.assertEqual(actual.prod_foto_variantes['origen'], otra_copia.prod_foto.name)
+
+
+class StockConcurrenteTests(TransactionTestCase):
+    """Varios hilos, cada uno con su conexión, se disputan las últimas unidades."""
+
+    HILOS = 8
+
+    def setUp(self):
+        self.producto = crear_producto(*crear_catalogos(), disponible=3)
+
+    def en_paralelo(self, funcion):
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+
+        def hilo():
+            try:
+                barrera.wait()
+                resultados.append(self.reintentar(funcion))
+            finally:
+                close_old_connections()
+
+        hilos = [threading.Thread(target=hilo) for _ in range(self.HILOS)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        return resultados
+
+    @staticmethod
+    def reintentar(funcion):
+        # SQLite rechaza al segundo escritor ("database is locked") en lugar de
+        # esperarlo; el movimiento se deshizo entero, así que se reintenta
+        while True:
+            try:
+                return funcion()
+            except OperationalError:
+                time.sleep(0.01)
+
+    def contadores(self):
+        return stock.contadores(self.producto.pk)
+
+    def test_no_se_presta_mas_de_lo_disponible(self):
+        resultados = self.en_paralelo(lambda: stock.prestar(self.producto.pk, 1))
+        self.assertEqual(resultados.count(True), 3)
+        actual = self.contadores()
+        self.assertEqual(actual['prod_cantidad_disponible'], 0)
+        self.assertEqual(actual['prod_cantidad_prestada'], 3)
+        self.assertEqual(actual['prod_estado'], 'agotado')
+
+    def test_no_se_devuelve_mas_de_lo_prestado(self):
+        self.assertTrue(stock.prestar(self.producto.pk, 2))
+        resultados = self.en_paralelo(lambda: stock.devolver(self.producto.pk, 1))
+        self.assertEqual(resultados.count(True), 2)
+        actual = self.contadores()
+        self.assertEqual(actual['prod_cantidad_disponible'], 3)
+        self.assertEqual(actual['prod_cantidad_prestada'], 0)
+
+    def test_prestamos_y_devoluciones_mezclados(self):
+        self.assertTrue(stock.prestar(self.producto.pk, 1))
+        mitad = self.HILOS // 2
+        orden = iter([stock.prestar] * mitad + [stock.devolver] * mitad)
+        lock = threading.Lock()
+
+        def movimiento():
+            with lock:
+                funcion = next(orden)
+            return funcion.__name__, self.reintentar(lambda: funcion(self.producto.pk, 1))
+
+        resultados = self.en_paralelo(movimiento)
+        prestados = sum(ok for nombre, ok in resultados if nombre == 'prestar')
+        devueltos = sum(ok for nombre, ok in resultados if nombre == 'devolver')
+        actual = self.contadores()
+        self.assertGreaterEqual(actual['prod_cantidad_disponible'], 0)
+        self.assertGreaterEqual(actual['prod_cantidad_prestada'], 0)
+        self.assertEqual(actual['prod_cantidad_prestada'], 1 + prestados - devueltos)
+        self.assertEqual(actual['prod_cantidad_disponible'] + actual['prod_cantidad_prestada'], 3)
+        self.assertEqual(
+            CambioInventario.objects.filter(modelo='producto', objeto_id=self.producto.pk).count(), 1,
+        )
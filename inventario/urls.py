@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TipoCategoriaViewSet, MarcaViewSet, PrestamoViewSet, ProductoViewSet
+from .views import TipoCategoriaViewSet, MarcaViewSet, PrestamoViewSet, ProductoViewSet, CambiosViewSet
 
 router = DefaultRouter()
 router.register(r"tipos-categoria", TipoCategoriaViewSet, basename="tipo-categoria")
 router.register(r"marcas", MarcaViewSet, basename="marca")
 router.register(r"prestamos", PrestamoViewSet, basename="prestamo")
 router.register(r"productos", ProductoViewSet, basename="producto")
+router.register(r"cambios", CambiosViewSet, basename="cambio")
 
 urlpatterns = [
     path("api/", include(router.urls)),
@@ -1,20 +1,56 @@
-from django.db import transaction
+import hashlib
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
+from . import autocompletar, catalogos, exportacion, importacion, sincronizacion, stock
+from .filters import ProductoFilter, ProductoSearchFilter
 from .models import TipoCategoria, Marca, Prestamo, Producto
 from .serializers import (
     TipoCategoriaSerializer, MarcaSerializer, PrestamoSerializer,
-    ProductoSerializer, OperacionStockSerializer,
+    ProductoSerializer, OperacionStockSerializer, MovimientosSerializer,
 )
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+
+from mi_proyecto.conditional import con_validadores, respuesta_no_modificada
+from serializer.mixins import CamposDinamicosViewMixin
 
 # ---- ViewSets CRUD de catálogos ----
 
-class TipoCategoriaViewSet(viewsets.ModelViewSet):
+class CatalogoCacheMixin:
+    """
+    Listado de catálogo con ETag por versión (ver catalogos.py).
+
+    El 304 sale sin tocar la base; si no, se reutiliza el listado ya armado
+    para la misma URL en esta versión del catálogo.
+    """
+
+    def list(self, request, *args, **kwargs):
+        modelo = self.queryset.model
+        version = catalogos.version(modelo)
+        url = request.build_absolute_uri()
+        etag = f"{version}-{hashlib.sha1(url.encode()).hexdigest()[:10]}"
+
+        no_modificado = respuesta_no_modificada(request, etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        clave = (modelo._meta.label_lower, version, url)
+        data = catalogos.respuestas.get(clave)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            catalogos.respuestas.set(clave, data)
+        return con_validadores(Response(data), etag)
+
+
+class TipoCategoriaViewSet(CatalogoCacheMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = TipoCategoria.objects.all().order_by("tipr_nombre")
     serializer_class = TipoCategoriaSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -22,7 +58,7 @@ class TipoCategoriaViewSet(viewsets.ModelViewSet):
     ordering_fields = ["tipr_nombre"]
 
 
-class MarcaViewSet(viewsets.ModelViewSet):
+class MarcaViewSet(CatalogoCacheMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Marca.objects.all().order_by("marca_nombre")
     serializer_class = MarcaSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -30,7 +66,7 @@ class MarcaViewSet(viewsets.ModelViewSet):
     ordering_fields = ["marca_nombre"]
 
 
-class PrestamoViewSet(viewsets.ModelViewSet):
+class PrestamoViewSet(CatalogoCacheMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Prestamo.objects.all().order_by("pres_nombre")
     serializer_class = PrestamoSerializer
     filter_backends = [SearchFilter, OrderingFilter]
@@ -40,7 +76,7 @@ class PrestamoViewSet(viewsets.ModelViewSet):
 
 # ---- ViewSet de Producto con acciones de inventario ----
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = (
         Producto.objects
         .select_related("tipo_categoria", "marca", "prestamo")
@@ -48,15 +84,12 @@ class ProductoViewSet(viewsets.ModelViewSet):
         .order_by("prod_nombre")
     )
     serializer_class = ProductoSerializer
+    lookup_value_regex = r"\d+"
     parser_classes = (MultiPartParser, FormParser)
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = [
-        "prod_estado",
-        "tipo_categoria__tipr_nombre",
-        "marca__marca_nombre",
-        "prestamo__pres_nombre",
-    ]
+    filter_backends = [DjangoFilterBackend, ProductoSearchFilter, OrderingFilter]
+    filterset_class = ProductoFilter
+    # Solo se usan si no hay índice FTS (ver ProductoSearchFilter)
     search_fields = [
         "prod_nombre", "prod_modelo",
         "marca__marca_nombre",
@@ -65,77 +98,231 @@ class ProductoViewSet(viewsets.ModelViewSet):
     ]
     ordering_fields = [
         "prod_nombre", "prod_valor_unitario",
-        # OJO: estas son CharField en tu modelo, el orden será lexicográfico
         "prod_cantidad_disponible", "prod_cantidad_total",
     ]
 
-    def _to_int(self, s):
+    # ---- GET condicional ----
+    # La respuesta depende de las filas de productos y de los nombres de los
+    # catálogos: el ETag junta MAX(actualizado_en), el conteo (cubre borrados)
+    # y la última entrada de catálogos en la bitácora del feed (sincronizacion.py).
+    # Sale de la base y no de las versiones de catalogos.py, que son por proceso:
+    # un cambio hecho en otro worker también cambia el ETag. Un sondeo sin
+    # cambios responde 304 con una sola consulta y sin pasar por el serializer.
+
+    def _ultimo_cambio_catalogos(self):
+        return sincronizacion.ultimo_cambio(TipoCategoria, Marca, Prestamo)
+
+    def _etag(self, *partes):
+        texto = "|".join(str(p) for p in partes)
+        return hashlib.sha1(texto.encode()).hexdigest()[:20]
+
+    def list(self, request, *args, **kwargs):
+        # Se filtra una vez para el ETag y la página (filter_queryset arma la
+        # búsqueda FTS y recorta columnas según ?fields=)
+        queryset = self.filter_queryset(self.get_queryset())
+        resumen = queryset.order_by().aggregate(
+            ultimo=Max("actualizado_en"), total=Count("pk"),
+            # Sin productos da NULL, pero entonces la respuesta no depende de los catálogos
+            catalogos=Max(self._ultimo_cambio_catalogos()),
+        )
+        etag = self._etag(
+            resumen["ultimo"], resumen["total"], resumen["catalogos"], request.build_absolute_uri(),
+        )
+        # Sin Last-Modified: un borrado no mueve el MAX
+        no_modificado = respuesta_no_modificada(request, etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+        return con_validadores(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        fila = (
+            Producto.objects.filter(pk=lookup)
+            .annotate(catalogos=self._ultimo_cambio_catalogos())
+            .values_list("actualizado_en", "catalogos").first()
+        )
+        if fila is None:
+            raise NotFound()
+        actualizado, cambio_catalogos = fila
+        etag = self._etag(lookup, actualizado, cambio_catalogos, request.build_absolute_uri())
+        # Last-Modified va solo informativo: renombrar una marca no mueve
+        # actualizado_en, así que el 304 se decide por el ETag
+        no_modificado = respuesta_no_modificada(request, etag)
+        if no_modificado is not None:
+            return no_modificado
+        return con_validadores(super().retrieve(request, *args, **kwargs), etag, actualizado)
+
+    # GET /productos/autocomplete/?q=mart&limite=10
+    # Responde desde el índice en memoria (autocompletar.py), sin serializar productos.
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def autocomplete(self, request):
+        try:
+            limite = int(request.query_params.get("limite", autocompletar.LIMITE))
+        except ValueError:
+            limite = autocompletar.LIMITE
+        limite = max(1, min(limite, autocompletar.LIMITE_MAXIMO))
+        return Response(autocompletar.indice().buscar(request.query_params.get("q", ""), limite))
+
+    # POST /productos/importar/  (multipart: archivo=<.csv|.xlsx>, formato opcional)
+    # Carga por lotes con bulk_create (importacion.py); responde el resumen con los errores por fila.
+    # Cada lote se confirma por separado: un archivo que se vuelve ilegible a mitad
+    # de camino responde 400 con lo que ya se creó.
+    @action(detail=False, methods=["post"], parser_classes=[MultiPartParser])
+    def importar(self, request):
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"archivo": ["Es obligatorio."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        importador = importacion.ImportadorProductos()
         try:
-            return int(str(s or "0").strip())
-        except Exception:
-            return 0
+            filas = importacion.filas(archivo.file, archivo.name, request.data.get("formato"))
+            resumen = importador.importar(filas)
+        except importacion.FormatoNoSoportado as e:
+            return Response({"archivo": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        except importacion.ArchivoIlegible as e:
+            # Los lotes anteriores ya se confirmaron: el resumen dice cuántos se crearon
+            return Response({"archivo": [str(e)], **importador.resumen()}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen, status=status.HTTP_200_OK)
+
+    # GET /productos/exportar/?formato=csv|ndjson&gzip=1  (acepta los mismos filtros del listado)
+    # Streaming desde values_list().iterator() (exportacion.py): la memoria no crece con la tabla.
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def exportar(self, request):
+        formato = request.query_params.get("formato", "csv").lower()
+        if formato not in exportacion.FORMATOS:
+            return Response(
+                {"formato": [f"Usa uno de: {', '.join(exportacion.FORMATOS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        comprimir = request.query_params.get("gzip", "").lower() in ("1", "true", "si", "sí")
+
+        queryset = self.filter_queryset(self.get_queryset())
+        nombre = f"productos-{timezone.now():%Y%m%d-%H%M}.{formato}"
+        content_type = exportacion.FORMATOS[formato]
+        if comprimir:
+            nombre += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(
+            exportacion.generar(queryset, formato, comprimir), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="{nombre}"'
+        return response
 
     # POST /productos/{id}/prestar/  { "cantidad": 3 }
+    # Responde solo los contadores, sin volver a serializar el producto.
     @action(detail=True, methods=["post"])
     def prestar(self, request, pk=None):
-        producto = self.get_object()
         ser = OperacionStockSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         cantidad = ser.validated_data["cantidad"]
 
-        with transaction.atomic():
-            disp = self._to_int(producto.prod_cantidad_disponible)
-            prest = self._to_int(producto.prod_cantidad_prestada)
-            total = self._to_int(producto.prod_cantidad_total)
-
-            if cantidad > disp:
-                return Response(
-                    {"detail": f"No hay suficiente stock. Disponible: {disp}."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            disp -= cantidad
-            prest += cantidad
-            # total siempre = disp + prest
-            total = disp + prest
-
-            producto.prod_cantidad_disponible = str(disp)
-            producto.prod_cantidad_prestada = str(prest)
-            producto.prod_cantidad_total = str(total)
-            if disp == 0:
-                producto.prod_estado = "agotado"
-            producto.save()
-
-        return Response(ProductoSerializer(producto).data, status=status.HTTP_200_OK)
+        ok = stock.prestar(pk, cantidad)
+        actual = self._contadores(pk)
+        if not ok:
+            return Response(
+                {"detail": f"No hay suficiente stock. Disponible: {actual['prod_cantidad_disponible']}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(actual, status=status.HTTP_200_OK)
 
     # POST /productos/{id}/devolver/  { "cantidad": 2 }
     @action(detail=True, methods=["post"])
     def devolver(self, request, pk=None):
-        producto = self.get_object()
         ser = OperacionStockSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         cantidad = ser.validated_data["cantidad"]
 
-        with transaction.atomic():
-            disp = self._to_int(producto.prod_cantidad_disponible)
-            prest = self._to_int(producto.prod_cantidad_prestada)
-            total = self._to_int(producto.prod_cantidad_total)
+        ok = stock.devolver(pk, cantidad)
+        actual = self._contadores(pk)
+        if not ok:
+            return Response(
+                {"detail": f"No puedes devolver más de lo prestado. Prestado: {actual['prod_cantidad_prestada']}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(actual, status=status.HTTP_200_OK)
 
-            if cantidad > prest:
-                return Response(
-                    {"detail": f"No puedes devolver más de lo prestado. Prestado: {prest}."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+    # POST /productos/movimientos/
+    # { "movimientos": [{"prod_id": 1, "cantidad": 2, "tipo": "prestar"}, ...] }
+    # Todo o nada en una transacción; responde los contadores de cada producto.
+    @action(detail=False, methods=["post"], parser_classes=[JSONParser])
+    def movimientos(self, request):
+        ser = MovimientosSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        movimientos = [
+            (m["prod_id"], m["cantidad"], m["tipo"]) for m in ser.validated_data["movimientos"]
+        ]
+
+        try:
+            productos = stock.aplicar_movimientos(movimientos)
+        except stock.MovimientosRechazados as e:
+            return Response(
+                {"detail": "No se aplicó ningún movimiento.", "errores": e.errores},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"productos": productos}, status=status.HTTP_200_OK)
+
+    def _contadores(self, pk):
+        actual = stock.contadores(pk)
+        if actual is None:
+            raise NotFound()
+        return actual
+
+
+# ---- Feed de sincronización ----
+
+class CambiosViewSet(viewsets.ViewSet):
+    """
+    GET /cambios/?since=<cursor>&limite=500
 
-            disp += cantidad
-            prest -= cantidad
-            total = disp + prest
+    Filas cambiadas después de ``since`` (ver sincronizacion.py) y los ids
+    borrados. El cliente guarda ``cursor`` y vuelve a pedir mientras ``mas``
+    sea true; con ``since=0`` recibe todo.
+    """
 
-            producto.prod_cantidad_disponible = str(disp)
-            producto.prod_cantidad_prestada = str(prest)
-            producto.prod_cantidad_total = str(total)
-            if disp > 0 and producto.prod_estado in (None, "", " ", "agotado", "sin_stock"):
-                producto.prod_estado = "activo"
-            producto.save()
+    SECCIONES = (
+        (TipoCategoria, "tipos_categoria", TipoCategoriaSerializer),
+        (Marca, "marcas", MarcaSerializer),
+        (Prestamo, "prestamos", PrestamoSerializer),
+        (Producto, "productos", ProductoSerializer),
+    )
+
+    def list(self, request):
+        cursor = self._entero(request, "since", 0)
+        limite = self._entero(request, "limite", sincronizacion.LIMITE)
+        limite = max(1, min(limite, sincronizacion.LIMITE_MAXIMO))
 
-        return Response(ProductoSerializer(producto).data, status=status.HTTP_200_OK)
+        cursor, mas, vivos, borrados = sincronizacion.pendientes(cursor, limite)
+        data = {"cursor": cursor, "mas": mas}
+        for modelo, clave, serializer_class in self.SECCIONES:
+            ids = vivos.get(sincronizacion.NOMBRES[modelo], [])
+            if not ids:
+                objetos = []
+            elif modelo is Producto:
+                objetos = (
+                    Producto.objects.select_related("tipo_categoria", "marca", "prestamo")
+                    .filter(pk__in=ids).order_by("pk")
+                )
+            else:
+                # De la base y no de catalogos.py: la copia en memoria de este
+                # proceso puede no tener aún filas nuevas y el cursor las saltaría
+                objetos = modelo.objects.filter(pk__in=ids).order_by("pk")
+            data[clave] = serializer_class(objetos, many=True, context={"request": request}).data
+        data["borrados"] = {
+            clave: borrados.get(sincronizacion.NOMBRES[modelo], []) for modelo, clave, _ in self.SECCIONES
+        }
+        return Response(data)
+
+    def _entero(self, request, nombre, defecto):
+        try:
+            valor = int(request.query_params.get(nombre, defecto))
+        except ValueError:
+            raise ValidationError({nombre: "Debe ser un número entero."})
+        if valor < 0:
+            raise ValidationError({nombre: "No puede ser negativo."})
+        return valor
@@ -0,0 +1,40 @@
+"""
+Helpers de GET condicional (ETag / Last-Modified) para vistas DRF.
+
+Uso típico en una vista::
+
+    no_modificado = respuesta_no_modificada(request, etag)
+    if no_modificado is not None:
+        return no_modificado
+    response = Response(...)
+    return con_validadores(response, etag)
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _cabeceras(response, etag, last_modified):
+    if etag is not None:
+        response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def respuesta_no_modificada(request, etag=None, last_modified=None):
+    """Devuelve un 304 si el cliente ya tiene esta versión, o None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    quoted = quote_etag(etag) if etag is not None else None
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=quoted, last_modified=timestamp)
+    if response is None:
+        return None
+    return _cabeceras(response, etag, last_modified)
+
+
+def con_validadores(response, etag=None, last_modified=None):
+    """Agrega ETag / Last-Modified a una respuesta 200."""
+    return _cabeceras(response, etag, last_modified)
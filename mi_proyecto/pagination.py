@@ -0,0 +1,220 @@
+"""
+Paginación por keyset (cursor) para los ViewSets del proyecto.
+
+A diferencia de LIMIT/OFFSET, cada página se pide con un WHERE sobre los
+valores de la última fila vista, así que el costo es O(página) aunque el
+cliente esté muy adentro del listado. La clave es el ordenamiento del queryset
+(el de la vista o el de ``?ordering=``) más la llave primaria como desempate.
+
+Los NULL se ordenan primero en orden ascendente y al final en descendente, igual
+en todos los motores, para que la comparación del cursor sea consistente.
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder recorta los microsegundos; el cursor necesita el valor exacto
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _valor(obj, campo):
+    """Lee ``campo`` (con ``__`` para relaciones) desde una instancia."""
+    partes = campo.split('__')
+    for i, parte in enumerate(partes):
+        if obj is None:
+            return None
+        if i == len(partes) - 1:
+            # Para una FK se usa la columna (<campo>_id) y no el objeto;
+            # las anotaciones no son campos del modelo y se leen tal cual
+            try:
+                field = obj._meta.get_field(parte) if hasattr(obj, '_meta') else None
+            except FieldDoesNotExist:
+                field = None
+            if field is not None and field.is_relation and field.many_to_one:
+                return getattr(obj, field.attname)
+        obj = getattr(obj, parte)
+    return obj
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    # Si es None se usa el order_by del queryset (o el Meta.ordering del modelo)
+    ordering = None
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'PAGINACION_TAMANO', 50)
+        self.max_page_size = getattr(settings, 'PAGINACION_TAMANO_MAXIMO', 200)
+
+    # ---- API de DRF ----
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.claves = self.get_claves(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverso = False
+        if cursor is not None:
+            valores, reverso = cursor
+            if len(valores) != len(self.claves):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self._despues_de(valores, reverso))
+
+        queryset = queryset.order_by(*self._order_by(reverso))
+        filas = list(queryset[:self.page_size + 1])
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if reverso:
+            filas.reverse()
+
+        if reverso:
+            self.has_next = True
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = cursor is not None
+
+        self.primera = filas[0] if filas else None
+        self.ultima = filas[-1] if filas else None
+        if not filas:
+            self.has_next = self.has_previous = False
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ---- Configuración ----
+
+    def get_page_size(self, request):
+        valor = request.query_params.get(self.page_size_query_param)
+        if valor is None:
+            return self.page_size
+        try:
+            tamano = int(valor)
+        except ValueError:
+            return self.page_size
+        if tamano <= 0:
+            return self.page_size
+        return min(tamano, self.max_page_size)
+
+    def get_claves(self, queryset):
+        """Lista de (campo, descendente) que identifica cada fila, terminando en la pk."""
+        ordering = self.ordering or queryset.query.order_by or queryset.model._meta.ordering
+        pk = queryset.model._meta.pk.name
+
+        claves = []
+        for campo in ordering:
+            if not isinstance(campo, str) or campo == '?':
+                continue
+            desc = campo.startswith('-')
+            nombre = campo.lstrip('-')
+            if nombre == 'pk':
+                nombre = pk
+            claves.append((nombre, desc))
+            if nombre == pk:
+                break
+
+        if not claves or claves[-1][0] != pk:
+            claves.append((pk, False))
+        return claves
+
+    # ---- SQL ----
+
+    def _order_by(self, reverso):
+        orden = []
+        for campo, desc in self.claves:
+            if desc != reverso:
+                orden.append(F(campo).desc(nulls_last=True))
+            else:
+                orden.append(F(campo).asc(nulls_first=True))
+        return orden
+
+    def _despues_de(self, valores, reverso):
+        """Q de las filas estrictamente posteriores a ``valores`` en el orden pedido."""
+        resultado = Q(pk__in=[])
+        iguales = Q()
+        for (campo, desc), valor in zip(self.claves, valores):
+            if desc != reverso:
+                # Descendente, NULL al final
+                if valor is None:
+                    mayor = Q(pk__in=[])
+                else:
+                    mayor = Q(**{f'{campo}__lt': valor}) | Q(**{f'{campo}__isnull': True})
+            else:
+                # Ascendente, NULL primero
+                if valor is None:
+                    mayor = Q(**{f'{campo}__isnull': False})
+                else:
+                    mayor = Q(**{f'{campo}__gt': valor})
+            resultado |= iguales & mayor
+
+            if valor is None:
+                iguales &= Q(**{f'{campo}__isnull': True})
+            else:
+                iguales &= Q(**{campo: valor})
+        return resultado
+
+    # ---- Cursores ----
+
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if codificado is None:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')).decode('utf-8'))
+            return list(datos['v']), bool(datos.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverso):
+        datos = {'v': [_valor(obj, campo) for campo, _ in self.claves]}
+        if reverso:
+            datos['r'] = 1
+        codificado = base64.urlsafe_b64encode(
+            json.dumps(datos, cls=_CursorEncoder, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, codificado)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.ultima, reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.primera, reverso=True)
@@ -108,21 +108,64 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.autenticacion.authentication.JWTCookieAuthentication',
     ),
     
       "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",  # <-- agrega esto
     ],
+    # Tamaño de página: PAGINACION_TAMANO. Las vistas que deben devolver todo
+    # ponen pagination_class = None
+    "DEFAULT_PAGINATION_CLASS": "mi_proyecto.pagination.KeysetPagination",
 }
 
+# Revocar el refresh token al rotarlo (/api/autenticacion/refresh/) o al cerrar sesión
+JWT_REFRESH_REVOCAR = True
+
+# Login asíncrono (apps/autenticacion/login.py): hilos que calculan el hash y
+# cuántos logins más pueden esperar antes de responder 503 (0 hilos = sin executor).
+# Conviene dejar núcleos libres para las lecturas: ver bench/login_rafaga.py
+LOGIN_CONCURRENCIA = 4
+LOGIN_COLA_MAXIMA = 32
+
+# Procesos para hashear contraseñas en importaciones masivas (None = núcleos disponibles)
+IMPORTACION_PROCESOS = None
+
+# Hilos que generan las miniaturas WebP de las fotos de producto (0 = en el mismo hilo)
+IMAGENES_HILOS = 2
+
+# Paginación por keyset (mi_proyecto/pagination.py)
+PAGINACION_TAMANO = 50
+PAGINACION_TAMANO_MAXIMO = 200
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Cache de permisos (apps/autenticacion/cache.py), de catálogos (inventario/catalogos.py)
+# y del índice de autocompletar (inventario/autocompletar.py).
+# Sin backend compartido (Redis/Memcached) cada proceso usa su LocMemCache y un
+# cambio tarda hasta el *_CACHE_TIMEOUT correspondiente en verse en los demás.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PERMISOS_CACHE_TIMEOUT = 300         # segundos en la cache de Django (y máximo de desfase entre procesos)
+PERMISOS_CACHE_LOCAL_MAXIMO = 1024   # usuarios en la cache local del proceso
+CATALOGOS_CACHE_TIMEOUT = 300        # segundos de la versión y la copia en memoria de cada catálogo
+AUTOCOMPLETAR_CACHE_TIMEOUT = 300    # segundos de la versión y del índice de autocompletar (inventario/autocompletar.py)
+
+# Autenticación sin BD (apps/autenticacion/authentication.py)
+JWT_TOKENS_VERIFICADOS_MAXIMO = 4096  # tokens con firma ya verificada
+USUARIOS_CACHE_MAXIMO = 512           # filas de Usuario en la cache TTL
+USUARIOS_CACHE_TTL = 60               # segundos
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
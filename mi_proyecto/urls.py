@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/autenticacion/', include('apps.autenticacion.urls')),
 
     path('usuarios/', UsuarioListView.as_view(), name='usuario-list-create'),
+    path('usuarios/importar/', UsuarioImportarView.as_view(), name='usuario-importar'),
     path('usuarios/<int:pk>/', UsuarioRetrieveUpdateDestroyView.as_view(), name='usuario-detail'),
     path('api/renta/', include('renta.urls')),
     path('api/inventario/', include('inventario.urls'))
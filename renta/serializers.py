@@ -1,28 +1,29 @@
 # app/serializers.py
 from rest_framework import serializers
+from serializer.mixins import CamposDinamicosMixin
 from .models import Renta, TipoPago, Estado, Pago, RentaProducto
 # Si necesitas mostrar campos de Usuario/Producto/etc., impórtalos también
 
 # ---------- 1) CRUD BÁSICO (FK por ID) ----------
-class RentaSerializer(serializers.ModelSerializer):
+class RentaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Renta
         fields = ['rent_id', 'renta_fecha_prestamo', 'renta_fecha_devolucion', 'usuario']
 
 
-class TipoPagoSerializer(serializers.ModelSerializer):
+class TipoPagoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoPago
         fields = ['tipa_id', 'tipa_nombre']
 
 
-class EstadoSerializer(serializers.ModelSerializer):
+class EstadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Estado
         fields = ['esta_id', 'esta_nombre']
 
 
-class PagoSerializer(serializers.ModelSerializer):
+class PagoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Pago
         fields = [
@@ -33,7 +34,7 @@ class PagoSerializer(serializers.ModelSerializer):
         ]
 
 
-class RentaProductoSerializer(serializers.ModelSerializer):
+class RentaProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = RentaProducto
         fields = [
@@ -53,7 +54,7 @@ class RentaProductoSerializer(serializers.ModelSerializer):
 
 # ---------- 2) LECTURA EXPANDIDA (solo para GET) ----------
 # Útil para mostrar nombres legibles sin complicar el POST/PUT
-class RentaReadSerializer(serializers.ModelSerializer):
+class RentaReadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     usuario_display = serializers.StringRelatedField(source='usuario', read_only=True)
     class Meta:
         model = Renta
@@ -63,7 +64,7 @@ class RentaReadSerializer(serializers.ModelSerializer):
         ]
 
 
-class PagoReadSerializer(serializers.ModelSerializer):
+class PagoReadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     renta_info = RentaReadSerializer(source='renta', read_only=True)
     tipo_pago_nombre = serializers.StringRelatedField(source='tipo_pago', read_only=True)
     estado_nombre = serializers.StringRelatedField(source='estado', read_only=True)
@@ -78,9 +79,11 @@ class PagoReadSerializer(serializers.ModelSerializer):
             'estado', 'estado_nombre',
             'renta', 'renta_info',
         ]
+        # renta_info (renta + usuario) solo con ?expand=renta_info
+        expandibles = ['renta_info']
 
 
-class RentaProductoReadSerializer(serializers.ModelSerializer):
+class RentaProductoReadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     renta_info = RentaReadSerializer(source='renta', read_only=True)
     # Para las demás FK usamos StringRelatedField (requiere __str__ correcto en cada modelo)
     producto_nombre = serializers.StringRelatedField(source='producto', read_only=True)
@@ -97,3 +100,4 @@ class RentaProductoReadSerializer(serializers.ModelSerializer):
             'marca', 'marca_nombre',
             'prestamo', 'prestamo_nombre',
         ]
+        expandibles = ['renta_info']
@@ -1,3 +1,67 @@
+import datetime
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.autenticacion.models import Usuario
+from inventario.models import Marca, Prestamo, Producto, TipoCategoria
+from renta.models import Estado, Pago, Renta, RentaProducto, TipoPago
+
+
+class CamposDinamicosTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(username='ana', password='x')
+        self.renta = Renta.objects.create(usuario=usuario, renta_fecha_prestamo=datetime.date(2026, 1, 5))
+        tipo_pago = TipoPago.objects.create(tipa_nombre='Efectivo')
+        estado = Estado.objects.create(esta_nombre='Pagado')
+        for total in (10, 20, 30):
+            Pago.objects.create(renta=self.renta, tipo_pago=tipo_pago, estado=estado, pago_total=total)
+
+        tipo = TipoCategoria.objects.create(tipr_nombre='Herramientas')
+        marca = Marca.objects.create(marca_nombre='Acme')
+        prestamo = Prestamo.objects.create(pres_nombre='Diario', tipo_prestamo='corto')
+        for nombre in ('Taladro', 'Sierra'):
+            producto = Producto.objects.create(
+                prod_nombre=nombre, prod_valor_unitario=1, tipo_categoria=tipo, marca=marca, prestamo=prestamo,
+            )
+            RentaProducto.objects.create(
+                renta=self.renta, producto=producto, tipo_categoria=tipo, marca=marca, prestamo=prestamo,
+            )
+
+    def get(self, url, consultas, **params):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(capturadas), consultas, [q['sql'] for q in capturadas.captured_queries])
+        return respuesta.data
+
+    def test_pagos_de_una_renta_en_dos_consultas(self):
+        url = f'/api/renta/rentas/{self.renta.pk}/pagos/'
+        for params in ({}, {'fields': 'pago_id,pago_total'}, {'expand': 'renta_info'}):
+            with self.subTest(**params):
+                datos = self.get(url, 2, **params)
+                self.assertEqual(len(datos), 3)
+        datos = self.get(url, 2, fields='pago_id,pago_total')
+        self.assertEqual(set(datos[0]), {'pago_id', 'pago_total'})
+
+    def test_productos_de_una_renta_en_dos_consultas(self):
+        url = f'/api/renta/rentas/{self.renta.pk}/productos/'
+        datos = self.get(url, 2)
+        self.assertEqual(sorted(p['producto_nombre'] for p in datos), ['Sierra (None)', 'Taladro (None)'])
+        datos = self.get(url, 2, fields='producto', expand='renta_info')
+        self.assertEqual(set(datos[0]), {'producto', 'renta_info'})
+
+    def test_fields_recorta_columnas_del_listado(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = self.client.get('/api/renta/pagos/', {'fields': 'pago_id,pago_total'}).data
+        self.assertEqual([set(p) for p in datos['results']], [{'pago_id', 'pago_total'}] * 3)
+        sql = capturadas.captured_queries[-1]['sql']
+        self.assertNotIn('tipo_pago', sql)
+        self.assertNotIn('pago_descuento', sql)
 
-# Create your tests here.
+    def test_expand_agrega_campos_caros(self):
+        datos = self.client.get('/api/renta/pagos/').data['results']
+        self.assertNotIn('renta_info', datos[0])
+        datos = self.client.get('/api/renta/pagos/', {'expand': 'renta_info'}).data['results']
+        self.assertEqual(datos[0]['renta_info']['rent_id'], self.renta.pk)
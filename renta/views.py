@@ -5,6 +5,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from serializer.mixins import CamposDinamicosViewMixin, recortar_queryset
+
 from .models import Renta, TipoPago, Estado, Pago, RentaProducto
 from .serializers import (
     RentaSerializer,
@@ -18,7 +20,7 @@ from .serializers import (
 )
 
 
-class RentaViewSet(viewsets.ModelViewSet):
+class RentaViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Renta.objects.select_related("usuario").all()
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -35,22 +37,30 @@ class RentaViewSet(viewsets.ModelViewSet):
     def pagos(self, request, pk=None):
         """/rentas/{id}/pagos/ -> lista los pagos de una renta"""
         renta = self.get_object()
-        qs = renta.pagos.select_related("tipo_pago", "estado", "renta").all()
-        serializer = PagoReadSerializer(qs, many=True)
+        campos, expandir = self._campos_pedidos()
+        pagos = recortar_queryset(
+            renta.pagos.select_related("tipo_pago", "estado", "renta__usuario"),
+            PagoReadSerializer(campos=campos, expandir=expandir),
+        )
+        serializer = PagoReadSerializer(pagos, many=True, campos=campos, expandir=expandir)
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"])
     def productos(self, request, pk=None):
         """/rentas/{id}/productos/ -> productos asociados a la renta"""
         renta = self.get_object()
-        qs = renta.renta_productos.select_related(
-            "producto", "tipo_categoria", "marca", "prestamo", "renta"
-        ).all()
-        serializer = RentaProductoReadSerializer(qs, many=True)
+        campos, expandir = self._campos_pedidos()
+        productos = recortar_queryset(
+            renta.renta_productos.select_related(
+                "producto", "tipo_categoria", "marca", "prestamo", "renta__usuario"
+            ),
+            RentaProductoReadSerializer(campos=campos, expandir=expandir),
+        )
+        serializer = RentaProductoReadSerializer(productos, many=True, campos=campos, expandir=expandir)
         return Response(serializer.data)
 
 
-class TipoPagoViewSet(viewsets.ModelViewSet):
+class TipoPagoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = TipoPago.objects.all()
     serializer_class = TipoPagoSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -59,7 +69,7 @@ class TipoPagoViewSet(viewsets.ModelViewSet):
     ordering_fields = ["tipa_nombre", "tipa_id"]
 
 
-class EstadoViewSet(viewsets.ModelViewSet):
+class EstadoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Estado.objects.all()
     serializer_class = EstadoSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -68,7 +78,7 @@ class EstadoViewSet(viewsets.ModelViewSet):
     ordering_fields = ["esta_nombre", "esta_id"]
 
 
-class PagoViewSet(viewsets.ModelViewSet):
+class PagoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Pago.objects.select_related(
         "tipo_pago", "estado", "renta", "renta__usuario"
     ).all()
@@ -88,7 +98,7 @@ class PagoViewSet(viewsets.ModelViewSet):
         return PagoSerializer
 
 
-class RentaProductoViewSet(viewsets.ModelViewSet):
+class RentaProductoViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = RentaProducto.objects.select_related(
         "renta", "producto", "tipo_categoria", "marca", "prestamo"
     ).all()
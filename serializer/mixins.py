@@ -0,0 +1,161 @@
+"""
+Campos a pedido para serializers y vistas DRF: ``?fields=`` y ``?expand=``.
+
+* ``?fields=prod_id,prod_nombre`` deja solo esos campos en la respuesta.
+* ``?expand=renta_info`` agrega campos caros que no salen por defecto; se
+  declaran en ``Meta.expandibles`` del serializer.
+
+La vista recorta además el queryset a lo que usan los campos que quedan:
+``only()`` con las columnas de la tabla principal y solo los
+``select_related`` / ``prefetch_related`` de relaciones que se van a leer.
+
+Columnas y relaciones se deducen del ``source`` de cada campo. Un FK expuesto
+como ``PrimaryKeyRelatedField`` solo necesita su columna; otro campo sobre un FK
+(nombre, serializer anidado) necesita la relación. Para lo que no se deduce
+(``SerializerMethodField``, propiedades) se declara ``Meta.dependencias``:
+``{campo: (rutas del modelo, ...)}``. Si algún campo no se puede resolver, el
+queryset se deja como está.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _lista(valor):
+    if not valor:
+        return None
+    return [v.strip() for v in valor.split(',') if v.strip()]
+
+
+class CamposDinamicosMixin:
+    """Serializer que acepta ``campos`` (lista o None = todos) y ``expandir``."""
+
+    def __init__(self, *args, campos=None, expandir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandir = set(expandir or ())
+        quitar = set(getattr(self.Meta, 'expandibles', ())) - expandir
+        if campos is not None:
+            quitar |= set(self.fields) - set(campos) - expandir
+        for nombre in quitar:
+            self.fields.pop(nombre, None)
+
+    def requisitos(self):
+        """
+        ``(columnas, relaciones)`` que leen los campos actuales, o None si alguno
+        no se puede resolver.
+        """
+        modelo = self.Meta.model
+        dependencias = getattr(self.Meta, 'dependencias', {})
+        columnas, relaciones = set(), set()
+        for nombre, field in self.fields.items():
+            if field.write_only:
+                continue
+            if nombre in dependencias:
+                rutas, solo_columna = dependencias[nombre], False
+            elif field.source == '*':
+                return None
+            else:
+                rutas = [field.source.replace('.', '__')]
+                solo_columna = (
+                    isinstance(field, serializers.PrimaryKeyRelatedField) and field.use_pk_only_optimization()
+                )
+            for ruta in rutas:
+                raiz = ruta.split('__')[0]
+                try:
+                    model_field = modelo._meta.get_field(raiz)
+                except FieldDoesNotExist:
+                    return None
+                if model_field.concrete:
+                    columnas.add(raiz)
+                if model_field.is_relation and not solo_columna:
+                    relaciones.add(raiz)
+        return columnas, relaciones
+
+
+def _rutas_select_related(arbol, prefijo=''):
+    for nombre, hijos in arbol.items():
+        ruta = f"{prefijo}{nombre}"
+        if hijos:
+            yield from _rutas_select_related(hijos, f"{ruta}__")
+        else:
+            yield ruta
+
+
+def recortar_queryset(queryset, serializer):
+    """``queryset`` con solo las columnas y relaciones que ``serializer`` va a leer."""
+    requisitos = serializer.requisitos()
+    if requisitos is None:
+        return queryset
+    columnas, relaciones = requisitos
+    modelo = queryset.model
+    columnas = columnas | {modelo._meta.pk.name}
+    # En un related manager (renta.pagos) Django asigna el padre a cada fila
+    # leyendo su FK: sin esa columna haría una query por fila
+    columnas |= {field.name for field in queryset._known_related_objects}
+
+    # La paginación por keyset lee de cada fila los campos del ordenamiento
+    for orden in queryset.query.order_by:
+        if not isinstance(orden, str):
+            continue
+        partes = orden.lstrip('-').split('__')
+        try:
+            model_field = modelo._meta.get_field(partes[0])
+        except FieldDoesNotExist:
+            continue  # anotación (p. ej. el rango de la búsqueda)
+        if model_field.concrete:
+            columnas.add(partes[0])
+        if model_field.is_relation and len(partes) > 1:
+            relaciones.add(partes[0])
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        rutas = [r for r in _rutas_select_related(select_related) if r.split('__')[0] in relaciones]
+        queryset = queryset.select_related(None)
+        if rutas:
+            queryset = queryset.select_related(*rutas)
+
+    prefetch = [
+        p for p in queryset._prefetch_related_lookups
+        if getattr(p, 'prefetch_through', p).split('__')[0] in relaciones
+    ]
+    queryset = queryset.prefetch_related(None)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    return queryset.only(*columnas)
+
+
+class CamposDinamicosViewMixin:
+    """
+    Vista que pasa ``?fields=`` / ``?expand=`` al serializer (en GET) y recorta
+    el queryset de list/retrieve a lo que este va a leer.
+    """
+
+    acciones_recortables = ('list', 'retrieve')
+
+    def _campos_pedidos(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        return _lista(request.query_params.get('fields')), _lista(request.query_params.get('expand'))
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), CamposDinamicosMixin):
+            campos, expandir = self._campos_pedidos()
+            kwargs.setdefault('campos', campos)
+            kwargs.setdefault('expandir', expandir)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Las vistas genéricas no tienen action: ahí basta con que sea GET
+        if getattr(self, 'action', None) not in (None, *self.acciones_recortables):
+            return queryset
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, CamposDinamicosMixin):
+            return queryset
+        campos, expandir = self._campos_pedidos()
+        serializer = serializer_class(campos=campos, expandir=expandir, context=self.get_serializer_context())
+        return recortar_queryset(queryset, serializer)
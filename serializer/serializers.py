@@ -1,5 +1,6 @@
 # Imports:
 from rest_framework import serializers
+from serializer.mixins import CamposDinamicosMixin
 from django.contrib.auth.models import User
 from apps.autenticacion.models import *
 from django.contrib.auth import get_user_model
@@ -30,7 +31,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 # USUARIO
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     rol_nombre = serializers.CharField(source='rol.nombre', read_only=True)
     rol_id = serializers.IntegerField(source='rol.id', read_only=True)
     roles = serializers.SerializerMethodField()
@@ -41,10 +42,11 @@ class UsuarioSerializer(serializers.ModelSerializer):
             'id', 'username', 'first_name', 'last_name', 'promedio', 'disponibilidad',
             'rol_id', 'rol_nombre', 'roles'
         ]
+        dependencias = {'roles': ('roles_asignados',)}
 
     def get_roles(self, obj):
-        from apps.autenticacion.models import UsuarioRol  # evita import circular
-        asignaciones = UsuarioRol.objects.filter(usuario=obj).select_related('rol')
+        # Usa el prefetch de la vista (roles_asignados + rol); sin él, una query por usuario
+        asignaciones = obj.roles_asignados.all()
         return [
             {
                 "id": ar.rol.id,
@@ -59,18 +61,18 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField()
 
 # ROL SIMPLE
-class RolSimpleSerializer(serializers.ModelSerializer):
+class RolSimpleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Rol
         fields = ['id', 'nombre']
 # ROL COMPLETO
-class RolSerializer(serializers.ModelSerializer):
+class RolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Rol
         fields = ['id', 'nombre', 'descripcion']
 
 # USUARIO X ROL
-class UsuarioRolSerializer(serializers.ModelSerializer):
+class UsuarioRolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     usuario = serializers.PrimaryKeyRelatedField(queryset=Usuario.objects.all())
     rol = serializers.PrimaryKeyRelatedField(queryset=Rol.objects.all())
 
@@ -78,14 +80,46 @@ class UsuarioRolSerializer(serializers.ModelSerializer):
         model = UsuarioRol
         fields = ['id', 'usuario', 'rol', 'asignado_en']
 
+# ASIGNACION / REVOCACION MASIVA DE UN ROL
+class AsignacionMasivaRolSerializer(serializers.Serializer):
+    ACCIONES = ('asignar', 'revocar')
+
+    rol = serializers.PrimaryKeyRelatedField(queryset=Rol.objects.all())
+    accion = serializers.ChoiceField(choices=ACCIONES, default='asignar')
+    # Una de las dos: ids explícitos o un filtro (mismos parámetros que /usuarios/)
+    usuarios = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filtro = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if ('usuarios' in attrs) == ('filtro' in attrs):
+            raise serializers.ValidationError('Envía "usuarios" o "filtro", no ambos.')
+
+        if 'filtro' in attrs:
+            from apps.autenticacion.filters import UsuarioFilter  # evita import circular
+            filtro = UsuarioFilter(data=attrs['filtro'], queryset=Usuario.objects.all())
+            if not filtro.is_valid():
+                raise serializers.ValidationError({'filtro': filtro.errors})
+            if not any(v not in (None, '') for v in filtro.form.cleaned_data.values()):
+                raise serializers.ValidationError({'filtro': 'El filtro no puede estar vacío.'})
+            attrs['usuarios_qs'] = filtro.qs
+        return attrs
+
 #RECURSO
-class RecursoSerializer(serializers.ModelSerializer):
+class RecursoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Recurso
         fields = ['id', 'nombre', 'url']
 
+    def validate_url(self, value):
+        from apps.autenticacion.rutas import PatronInvalido, validar_patron
+        try:
+            validar_patron(value)
+        except PatronInvalido as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
 #RECURSOXROL
-class RecursoRolSerializer(serializers.ModelSerializer):
+class RecursoRolSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = RecursoRol
         fields = ['id', 'rol', 'recurso', 'asignado_en']